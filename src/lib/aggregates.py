@@ -0,0 +1,79 @@
+import datetime
+import functools
+import threading
+
+
+""" Get (year, month) of day ordinal """
+@functools.lru_cache(maxsize=8192)
+def month_of(ordinal):
+	date = datetime.date.fromordinal(ordinal)
+	return date.year, date.month
+
+
+"""
+Count and sum of items per category and per month.
+Kept up to date by add / replace on every change of items,
+so totals are never recomputed while list is loaded.
+spec - filter spec of ItemIndex (first date, last date, min cents, max cents, category)
+	items not matching it are not counted, None - count all items
+"""
+class Aggregates():
+	def __init__(self, spec=None):
+		self.spec = spec
+		self._lock = threading.Lock()
+		# category -> [count, cents]
+		self.categories = {}
+		# (year, month) -> [count, cents]
+		self.months = {}
+		self.count = 0
+		self.cents = 0
+
+	def matches(self, item):
+		if item is None:
+			return False
+		if self.spec is None:
+			return True
+		first_date, last_date, low, high, category = self.spec
+		return first_date <= item.date <= last_date and low <= item.cents <= high \
+			and (category is None or item.category == category)
+
+	def _add(self, item, sign):
+		for totals, key in ((self.categories, item.category), (self.months, month_of(item.date))):
+			entry = totals.get(key)
+			if entry is None:
+				entry = totals[key] = [0, 0]
+			entry[0] += sign
+			entry[1] += sign*item.cents
+			if entry[0] == 0:
+				del totals[key]
+		self.count += sign
+		self.cents += sign*item.cents
+
+	""" Count items from scratch, items must match spec """
+	def reset(self, items):
+		with self._lock:
+			self.categories = {}
+			self.months = {}
+			self.count = 0
+			self.cents = 0
+			for item in items:
+				self._add(item, 1)
+
+	"""
+	Apply change of one item
+	old - previous version of item or None for new item
+	new - new version of item or None for deleted item
+	"""
+	def replace(self, old, new):
+		with self._lock:
+			if self.matches(old):
+				self._add(old, -1)
+			if self.matches(new):
+				self._add(new, 1)
+
+	""" Get lists of (category, count, cents) and ((year, month), count, cents) """
+	def rows(self):
+		with self._lock:
+			categories = sorted((key, count, cents) for key, (count, cents) in self.categories.items())
+			months = sorted((key, count, cents) for key, (count, cents) in self.months.items())
+		return categories, months
@@ -0,0 +1,96 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+"""
+Shared HTTP client for Photis API
+keeps one keep-alive connection pool for all views,
+holds auth headers after login and applies default timeouts
+root_url - root url for requests to API
+timeout - default (connect, read) timeout in seconds
+pool_size - max number of kept-alive connections to API host
+"""
+class ApiClient():
+	def __init__(self, root_url, timeout=(5, 30), pool_size=10):
+		self.root_url = root_url.rstrip('/')
+		self.timeout = timeout
+		self.pool_size = pool_size
+		self._lock = threading.Lock()
+		self._requests_count = 0
+		self.session = self._create_session()
+
+	def _create_session(self):
+		session = requests.Session()
+		self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+		session.mount('http://', self.adapter)
+		session.mount('https://', self.adapter)
+		return session
+
+	""" Set auth token received on login """
+	def set_token(self, token):
+		self.session.headers['Authorization'] = f'Bearer {token}'
+
+	def url(self, path):
+		return f"{self.root_url}/{path.lstrip('/')}"
+
+	def request(self, method, path, **kwargs):
+		kwargs.setdefault('timeout', self.timeout)
+		with self._lock:
+			self._requests_count += 1
+		return self.session.request(method, self.url(path), **kwargs)
+
+	def get(self, path, **kwargs):
+		return self.request('GET', path, **kwargs)
+
+	def post(self, path, **kwargs):
+		return self.request('POST', path, **kwargs)
+
+	def delete(self, path, **kwargs):
+		return self.request('DELETE', path, **kwargs)
+
+	"""
+	GET request with cache validators of stored response.
+	validators - {"etag", "last_modified"} saved from previous response,
+	server replies 304 if stored response is still valid
+	"""
+	def conditional_get(self, path, validators=None, **kwargs):
+		headers = dict(kwargs.pop('headers', None) or {})
+		if validators:
+			if validators.get("etag"):
+				headers['If-None-Match'] = validators["etag"]
+			if validators.get("last_modified"):
+				headers['If-Modified-Since'] = validators["last_modified"]
+		return self.get(path, headers=headers, **kwargs)
+
+	""" Get cache validators from response headers """
+	@staticmethod
+	def validators(resp):
+		validators = {
+			"etag": resp.headers.get('ETag'),
+			"last_modified": resp.headers.get('Last-Modified')
+		}
+		if not any(validators.values()):
+			return None
+		return validators
+
+	"""
+	Connection reuse statistics.
+	connections - number of opened TCP connections (handshakes),
+	reused - requests served over already opened connections
+	"""
+	def stats(self):
+		connections = 0
+		pools = self.adapter.poolmanager.pools
+		for key in list(pools.keys()):
+			pool = pools.get(key)
+			if pool is not None:
+				connections += pool.num_connections
+		return {
+			"requests": self._requests_count,
+			"connections": connections,
+			"reused": max(0, self._requests_count - connections)
+		}
+
+	def close(self):
+		self.session.close()
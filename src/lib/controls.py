@@ -14,3 +14,46 @@ def ClickableDatacell(text: str, on_tap: Callable) -> ft.DataCell:
 		on_tap=on_tap
 	)
 	return cell
+
+
+""" Clickable text with on_tap handler function, can be used outside of tables """
+def ClickableText(text: str, on_tap: Callable) -> ft.GestureDetector:
+	return ft.GestureDetector(
+		content=ft.Text(
+			text,
+			weight=ft.FontWeight.BOLD,
+			style="textDecoration: underline; color: blue; cursor: pointer"
+		),
+		mouse_cursor=ft.MouseCursor.CLICK,
+		on_tap=on_tap
+	)
+
+
+"""
+Clickable photo preview with on_tap handler function.
+Shows text until thumbnail is set with set_preview
+"""
+def ClickablePreview(text: str, on_tap: Callable, height: int) -> ft.GestureDetector:
+	return ft.GestureDetector(
+		content=ft.Row(
+			controls=[
+				ft.Image(visible=False, height=height, width=height*4//3, fit=ft.ImageFit.CONTAIN, border_radius=4),
+				ft.Text(
+					text,
+					weight=ft.FontWeight.BOLD,
+					style="textDecoration: underline; color: blue; cursor: pointer"
+				)
+			],
+			spacing=8
+		),
+		mouse_cursor=ft.MouseCursor.CLICK,
+		on_tap=on_tap
+	)
+
+
+""" Show thumbnail (base64 string) in ClickablePreview, None - show text """
+def set_preview(preview: ft.GestureDetector, thumbnail):
+	image, text = preview.content.controls
+	image.src_base64 = thumbnail
+	image.visible = thumbnail is not None
+	text.visible = thumbnail is None
@@ -0,0 +1,84 @@
+import os
+import json
+import requests
+
+
+def _load_meta(meta_path):
+	try:
+		with open(meta_path) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return None
+
+
+def _remove(*paths):
+	for path in paths:
+		if os.path.isfile(path):
+			os.remove(path)
+
+
+"""
+Download body of GET request straight to file.
+Body is written in chunks to file_path + '.part' and renamed to file_path when complete,
+so memory use doesn't depend on file size and file_path never holds partial data.
+If partial file of interrupted download exists and server sent validators for it,
+download continues from its end (Range + If-Range), server may send whole body again.
+api - ApiClient
+path - api path
+file_path - target file
+headers - extra request headers (e.g. conditional ones)
+on_progress - function(done, total) called after every chunk, total is None if unknown
+retries - number of resume attempts after connection errors
+Returns response with consumed body; file is written only on 200 / 206 reply
+"""
+def download(api, path, file_path, headers=None, on_progress=None, chunk_size=64*1024, retries=3, **kwargs):
+	part_path = file_path + '.part'
+	meta_path = part_path + '.json'
+	attempt = 0
+	while True:
+		request_headers = dict(headers or {})
+		meta = _load_meta(meta_path) if os.path.isfile(part_path) else None
+		offset = os.path.getsize(part_path) if meta else 0
+		if offset:
+			request_headers['Range'] = f'bytes={offset}-'
+			request_headers['If-Range'] = meta.get("etag") or meta.get("last_modified")
+		try:
+			resp = api.get(path, headers=request_headers, stream=True, **kwargs)
+			if resp.status_code not in [200, 206]:
+				resp.close()
+				return resp
+			if resp.status_code == 200:
+				# server sent whole body
+				offset = 0
+			length = resp.headers.get('Content-Length')
+			if resp.headers.get('Content-Encoding', 'identity') != 'identity':
+				# length of compressed body is not comparable with written bytes
+				length = None
+			total = offset + int(length) if length is not None else None
+			validators = api.validators(resp)
+			if validators is not None:
+				with open(meta_path, 'w') as f:
+					json.dump(validators, f)
+			else:
+				# partial file can't be validated later, don't resume it
+				_remove(meta_path)
+			done = offset
+			try:
+				with open(part_path, 'ab' if offset else 'wb') as f:
+					for chunk in resp.iter_content(chunk_size):
+						f.write(chunk)
+						done += len(chunk)
+						if on_progress is not None:
+							on_progress(done, total)
+			finally:
+				resp.close()
+			if total is not None and done < total:
+				raise requests.ConnectionError(f"connection closed after {done} of {total} bytes")
+			os.replace(part_path, file_path)
+			_remove(meta_path)
+			return resp
+		except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+			attempt += 1
+			if attempt > retries:
+				raise
+			print(f"> Download {path} interrupted: {e}, attempt {attempt} of {retries}")
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import threading
+
+
+"""
+On-disk cache of API responses with validators (ETag / Last-Modified)
+stored responses are revalidated with conditional GET,
+on 304 reply body is served from local cache
+api - shared ApiClient
+root - cache directory
+"""
+class ResponseCache():
+	def __init__(self, api, root):
+		self.api = api
+		self.root = root
+		self._lock = threading.Lock()
+		os.makedirs(self.root, exist_ok=True)
+
+	def _paths(self, path):
+		name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+		return os.path.join(self.root, name + '.body'), os.path.join(self.root, name + '.meta')
+
+	def _load_validators(self, path):
+		body_path, meta_path = self._paths(path)
+		if not os.path.isfile(body_path):
+			return None
+		try:
+			with open(meta_path) as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return None
+
+	def _read_chunks(self, file_path, chunk_size):
+		with open(file_path, 'rb') as f:
+			while True:
+				chunk = f.read(chunk_size)
+				if not chunk:
+					return
+				yield chunk
+
+	""" Pass chunks of response through and save them as cached body """
+	def _store_chunks(self, path, resp, validators, chunk_size):
+		body_path, meta_path = self._paths(path)
+		tmp_path = f"{body_path}.{threading.get_ident()}.part"
+		try:
+			with open(tmp_path, 'wb') as f:
+				for chunk in resp.iter_content(chunk_size):
+					f.write(chunk)
+					yield chunk
+			with self._lock:
+				os.replace(tmp_path, body_path)
+				with open(meta_path, 'w') as f:
+					json.dump(validators, f)
+		finally:
+			resp.close()
+			if os.path.isfile(tmp_path):
+				os.remove(tmp_path)
+
+	""" Remove stored response """
+	def invalidate(self, path):
+		for file_path in self._paths(path):
+			if os.path.isfile(file_path):
+				os.remove(file_path)
+
+	"""
+	Get response body of path as iterator of chunks and headers of server reply.
+	Body is read from network (and saved to cache at the same time) or from cache on 304 reply.
+	Returns (None, headers) if request failed
+	"""
+	def stream(self, path, chunk_size=64*1024, **kwargs):
+		validators = self._load_validators(path)
+		resp = self.api.conditional_get(path, validators, stream=True, **kwargs)
+		if resp.status_code == 304 and validators is not None:
+			resp.close()
+			print(f"> {path} : not modified, served from cache")
+			return self._read_chunks(self._paths(path)[0], chunk_size), resp.headers
+		if resp.status_code not in [200, 204]:
+			resp.close()
+			return None, resp.headers
+		new_validators = self.api.validators(resp)
+		if new_validators is None:
+			self.invalidate(path)
+			return resp.iter_content(chunk_size), resp.headers
+		return self._store_chunks(path, resp, new_validators, chunk_size), resp.headers
+
+	"""
+	Get response body of path and headers of server reply.
+	Returns (None, headers) if request failed
+	"""
+	def get(self, path, **kwargs):
+		chunks, headers = self.stream(path, **kwargs)
+		if chunks is None:
+			return None, headers
+		return b''.join(chunks), headers
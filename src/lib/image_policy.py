@@ -0,0 +1,82 @@
+import os
+
+import cv2 as cv
+import numpy as np
+
+
+FORMATS = {
+	"jpeg": ('.jpg', cv.IMWRITE_JPEG_QUALITY),
+	"webp": ('.webp', cv.IMWRITE_WEBP_QUALITY),
+}
+
+
+"""
+Downscale and recompression of photos before upload.
+Photos larger than max_side are downscaled, every photo is re-encoded
+with given format and quality, which also drops EXIF (orientation is
+applied to pixels on decoding). Original file is sent as is if it is
+small enough and re-encoding doesn't make it smaller, unless EXIF must be
+stripped or photo must be converted to grayscale.
+max_side - max length of long edge in pixels, 0 - keep resolution
+format - jpeg / webp
+quality - quality of encoding, 1-100
+strip_exif - never send original file, which may contain EXIF
+grayscale - convert photos to grayscale (for receipts and other documents)
+"""
+class ImagePolicy():
+	def __init__(self, max_side=2000, format='jpeg', quality=85, strip_exif=True, grayscale=False):
+		if format not in FORMATS:
+			raise ValueError(f"Unknown image format: {format}")
+		self.max_side = max_side
+		self.format = format
+		self.quality = quality
+		self.strip_exif = strip_exif
+		self.grayscale = grayscale
+
+	@property
+	def extension(self):
+		return FORMATS[self.format][0]
+
+	"""
+	Get encoded photo of upload size.
+	data - content of photo file
+	Returns (encoded bytes, photo was downscaled) or (None, False) if photo can't be decoded
+	"""
+	def encode(self, data):
+		mode = cv.IMREAD_GRAYSCALE if self.grayscale else cv.IMREAD_COLOR
+		frame = cv.imdecode(np.frombuffer(data, dtype=np.uint8), mode)
+		if frame is None:
+			return None, False
+		height, width = frame.shape[:2]
+		resized = bool(self.max_side) and max(height, width) > self.max_side
+		if resized:
+			scale = self.max_side / max(height, width)
+			size = (max(1, int(width*scale)), max(1, int(height*scale)))
+			frame = cv.resize(frame, size, interpolation=cv.INTER_AREA)
+		extension, quality_flag = FORMATS[self.format]
+		ok, buffer = cv.imencode(extension, frame, [quality_flag, self.quality])
+		if not ok:
+			return None, False
+		return buffer.tobytes(), resized
+
+	"""
+	Apply policy to photo file.
+	file_path - path of photo
+	target_dir - directory for converted photo
+	Returns path of file to upload: converted photo or file_path itself
+	"""
+	def apply(self, file_path, target_dir):
+		with open(file_path, 'rb') as f:
+			data = f.read()
+		encoded, resized = self.encode(data)
+		if encoded is None:
+			print(f"> Upload : can't decode {file_path}, sending original file")
+			return file_path
+		keep_original = not (resized or self.strip_exif or self.grayscale)
+		if keep_original and len(encoded) >= len(data):
+			return file_path
+		name = os.path.splitext(os.path.basename(file_path))[0]
+		target_path = os.path.join(target_dir, f"upload_{name}{self.extension}")
+		with open(target_path, 'wb') as f:
+			f.write(encoded)
+		return target_path
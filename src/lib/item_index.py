@@ -0,0 +1,353 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from lib import models
+from lib.item_store import ItemStore
+from lib.aggregates import Aggregates
+
+
+# index keys are (value << ID_BITS) | id, so equal values are ordered by id
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def _key(value, id):
+	return (value << ID_BITS) | id
+
+
+"""
+Sorted list of unique int keys split into buckets of limited size,
+so add / discard move at most bucket of keys instead of whole list:
+O(log n + BUCKET) per change. Positions of keys are counted from sizes
+of buckets, which are summed again on first search after change (O(n / BUCKET)).
+"""
+class SortedKeys():
+	BUCKET = 1024
+
+	def __init__(self, keys=()):
+		keys = sorted(keys)
+		self._buckets = [keys[i:i + self.BUCKET] for i in range(0, len(keys), self.BUCKET)]
+		self._maxes = [bucket[-1] for bucket in self._buckets]
+		self._len = len(keys)
+		# number of keys before every bucket, None after change
+		self._offsets = None
+
+	def __len__(self):
+		return self._len
+
+	def __iter__(self):
+		for bucket in self._buckets:
+			yield from bucket
+
+	def add(self, key):
+		self._offsets = None
+		self._len += 1
+		if not self._buckets:
+			self._buckets.append([key])
+			self._maxes.append(key)
+			return
+		i = min(bisect.bisect_left(self._maxes, key), len(self._maxes) - 1)
+		bucket = self._buckets[i]
+		bisect.insort(bucket, key)
+		self._maxes[i] = bucket[-1]
+		if len(bucket) > 2*self.BUCKET:
+			self._buckets[i:i + 1] = [bucket[:self.BUCKET], bucket[self.BUCKET:]]
+			self._maxes[i:i + 1] = [bucket[self.BUCKET - 1], bucket[-1]]
+
+	def discard(self, key):
+		i = bisect.bisect_left(self._maxes, key)
+		if i == len(self._maxes):
+			return
+		bucket = self._buckets[i]
+		j = bisect.bisect_left(bucket, key)
+		if j == len(bucket) or bucket[j] != key:
+			return
+		del bucket[j]
+		self._offsets = None
+		self._len -= 1
+		if bucket:
+			self._maxes[i] = bucket[-1]
+		else:
+			del self._buckets[i]
+			del self._maxes[i]
+
+	def _get_offsets(self):
+		if self._offsets is None:
+			offsets = [0]*len(self._buckets)
+			total = 0
+			for i, bucket in enumerate(self._buckets):
+				offsets[i] = total
+				total += len(bucket)
+			self._offsets = offsets
+		return self._offsets
+
+	def bisect_left(self, key):
+		i = bisect.bisect_left(self._maxes, key)
+		if i == len(self._maxes):
+			return self._len
+		return self._get_offsets()[i] + bisect.bisect_left(self._buckets[i], key)
+
+	def bisect_right(self, key):
+		i = bisect.bisect_right(self._maxes, key)
+		if i == len(self._maxes):
+			return self._len
+		return self._get_offsets()[i] + bisect.bisect_right(self._buckets[i], key)
+
+	""" Get list of keys at positions [start, stop) """
+	def slice(self, start, stop):
+		offsets = self._get_offsets()
+		result = []
+		i = max(0, bisect.bisect_right(offsets, start) - 1)
+		while i < len(self._buckets) and offsets[i] < stop:
+			result.extend(self._buckets[i][max(0, start - offsets[i]):stop - offsets[i]])
+			i += 1
+		return result
+
+
+"""
+Secondary indexes of loaded items.
+Sorted keys of date and sum (SortedKeys) are searched with bisect,
+category name is mapped to set of item ids.
+Narrow filters only touch items found in the most selective index,
+wide filters fall back to vectorized scan of ItemStore built on demand.
+Indexes are built on first filter, so loading of list is not slowed down.
+Results of recent filters are kept in LRU cache, stricter filter is applied
+to cached result of wider one. Cache is cleared on any change of items.
+Totals per category / month of all items and of recent filters are
+updated on every change (see Aggregates).
+"""
+class ItemIndex():
+	# filter is answered from index if candidates are less than this part of all items
+	INDEX_FRACTION = 0.01
+	# same for narrowing of cached result, it needs no sorting and lookups
+	NARROW_FRACTION = 0.1
+	# number of cached filter results
+	CACHE_SIZE = 16
+
+	def __init__(self, items=()):
+		self._lock = threading.RLock()
+		self.rebuild(items)
+
+	""" Build indexes of new item list """
+	def rebuild(self, items):
+		with self._lock:
+			self._rebuild(items)
+
+	def _rebuild(self, items):
+		# filter spec -> list of matching items
+		self._cache = OrderedDict()
+		# Aggregates of all items, counted on first request
+		self._totals = None
+		# filter spec -> Aggregates of matching items
+		self._summaries = OrderedDict()
+		# item id -> item, in order of loaded list
+		self.items = {item.id: item for item in items}
+		# item id -> sequence number, keeps filter results in list order
+		self.order = {}
+		for item in self.items.values():
+			self.order[item.id] = len(self.order)
+		self._next_order = len(self.order)
+		self.by_category = None
+		self.dates = None
+		self.sums = None
+		self._store = None
+
+	""" Build sorted keys and category map if they are not built yet """
+	def build(self):
+		with self._lock:
+			if self.dates is None:
+				self._build()
+
+	def _build(self):
+		self.by_category = {}
+		for item in self.items.values():
+			self.by_category.setdefault(item.category, set()).add(item.id)
+		self.dates = SortedKeys(_key(item.date, item.id) for item in self.items.values())
+		self.sums = SortedKeys(_key(item.cents, item.id) for item in self.items.values())
+
+	def __len__(self):
+		return len(self.items)
+
+	def _unlink(self, item):
+		if self.dates is None:
+			return
+		self.dates.discard(_key(item.date, item.id))
+		self.sums.discard(_key(item.cents, item.id))
+		ids = self.by_category.get(item.category)
+		if ids is not None:
+			ids.discard(item.id)
+			if not ids:
+				del self.by_category[item.category]
+
+	""" Add new item or replace indexed item with the same id """
+	def update(self, item):
+		with self._lock:
+			self._cache.clear()
+			self._update(item)
+
+	def _update(self, item):
+		old = self.items.get(item.id)
+		for aggregates in self._live_aggregates():
+			aggregates.replace(old, item)
+		if old is not None:
+			self._unlink(old)
+		else:
+			self.order[item.id] = self._next_order
+			self._next_order += 1
+		self.items[item.id] = item
+		self._store = None
+		if self.dates is not None:
+			self.dates.add(_key(item.date, item.id))
+			self.sums.add(_key(item.cents, item.id))
+			self.by_category.setdefault(item.category, set()).add(item.id)
+
+	def remove(self, id):
+		with self._lock:
+			self._cache.clear()
+			self._remove(id)
+
+	def _remove(self, id):
+		item = self.items.pop(id, None)
+		if item is None:
+			return
+		for aggregates in self._live_aggregates():
+			aggregates.replace(item, None)
+		self._unlink(item)
+		del self.order[id]
+		self._store = None
+
+	""" Get slice bounds of keys with values in [low, high] """
+	def _range(self, keys, low, high):
+		first = 0 if low == -float('inf') else keys.bisect_left(_key(low, 0))
+		last = len(keys) if high == float('inf') else keys.bisect_right(_key(high, ID_MASK))
+		return first, max(first, last)
+
+	"""
+	Get filter spec: (first date ordinal, last date ordinal, min cents, max cents, category).
+	start, end - sql dates or None
+	minimum_sum, maximum_sum - sums in currency units
+	category - category name or None
+	"""
+	def spec(self, start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+		return (
+			models.parse_date(start) if start is not None else -float('inf'),
+			models.parse_date(end) if end is not None else float('inf'),
+			models.parse_cents(minimum_sum) if minimum_sum != -float('inf') else minimum_sum,
+			models.parse_cents(maximum_sum) if maximum_sum != float('inf') else maximum_sum,
+			category
+		)
+
+	"""
+	Get list of items matching filter, in order of loaded list.
+	Parameters are the same as in spec()
+	"""
+	def filter(self, start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+		spec = self.spec(start, end, minimum_sum, maximum_sum, category)
+		with self._lock:
+			result = self._cache.get(spec)
+			if result is not None:
+				self._cache.move_to_end(spec)
+				return result
+			result = self._query(spec)
+			self._cache[spec] = result
+			if len(self._cache) > self.CACHE_SIZE:
+				self._cache.popitem(last=False)
+			return result
+
+	""" Drop cached filter results, next filters are queried from indexes """
+	def clear_cache(self):
+		with self._lock:
+			self._cache.clear()
+
+	""" Get smallest cached result of filter which is wider than spec or None """
+	def _cached_superset(self, spec):
+		best = None
+		for cached, result in self._cache.items():
+			if (
+				cached[0] <= spec[0] and spec[1] <= cached[1]
+				and cached[2] <= spec[2] and spec[3] <= cached[3]
+				and cached[4] in (None, spec[4])
+				and (best is None or len(result) < len(best))
+			):
+				best = result
+		return best
+
+	def _query(self, spec):
+		first_date, last_date, low, high, category = spec
+		if self.dates is None:
+			self._build()
+
+		# cardinality of every condition is known from index bounds, use the smallest one
+		date_range = self._range(self.dates, first_date, last_date)
+		sum_range = self._range(self.sums, low, high)
+		candidates = [
+			(date_range[1] - date_range[0], self.dates, date_range),
+			(sum_range[1] - sum_range[0], self.sums, sum_range),
+		]
+		if category is not None:
+			ids = self.by_category.get(category, ())
+			candidates.append((len(ids), ids, None))
+		count, keys, bounds = min(candidates, key=lambda candidate: candidate[0])
+
+		superset = self._cached_superset(spec)
+		if superset is not None and len(superset) <= min(count, len(self.items)*self.NARROW_FRACTION):
+			# narrow result of wider filter, it is already in list order
+			return self._select(superset, spec)
+		if count > len(self.items)*self.INDEX_FRACTION:
+			# spec has parsed bounds, so result is the same as on index path
+			return self.store().select(*spec)
+
+		if bounds is None:
+			ids = list(keys)
+		else:
+			ids = [key & ID_MASK for key in keys.slice(*bounds)]
+		ids.sort(key=self.order.__getitem__)
+		return self._select(map(self.items.__getitem__, ids), spec)
+
+	""" Get items matching filter spec from candidates """
+	def _select(self, candidates, spec):
+		first_date, last_date, low, high, category = spec
+		return [
+			item for item in candidates
+			if first_date <= item.date <= last_date and low <= item.cents <= high
+			and (category is None or item.category == category)
+		]
+
+	def _live_aggregates(self):
+		if self._totals is not None:
+			yield self._totals
+		yield from self._summaries.values()
+
+	""" Get Aggregates of all items """
+	def totals(self):
+		with self._lock:
+			if self._totals is None:
+				self._totals = Aggregates()
+				self._totals.reset(self.items.values())
+			return self._totals
+
+	"""
+	Get Aggregates of items matching filter, parameters are the same as in spec().
+	Aggregates of recent filters are kept and updated on changes
+	"""
+	def summary(self, start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+		spec = self.spec(start, end, minimum_sum, maximum_sum, category)
+		with self._lock:
+			aggregates = self._summaries.get(spec)
+			if aggregates is not None:
+				self._summaries.move_to_end(spec)
+				return aggregates
+			aggregates = Aggregates(spec)
+			aggregates.reset(self.filter(start, end, minimum_sum, maximum_sum, category))
+			self._summaries[spec] = aggregates
+			if len(self._summaries) > self.CACHE_SIZE:
+				self._summaries.popitem(last=False)
+			return aggregates
+
+	""" Columnar copy of indexed items, rebuilt after changes when wide filter needs it """
+	def store(self):
+		with self._lock:
+			if self._store is None:
+				self._store = ItemStore(self.items.values())
+			return self._store
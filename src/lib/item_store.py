@@ -0,0 +1,83 @@
+import numpy as np
+
+from lib import models
+
+
+"""
+Columnar store of loaded items for fast filtering.
+Date ordinals, sums in cents and dictionary-encoded categories are kept
+in numpy arrays, filters are boolean masks combined with vector operations.
+items - list of lib.models.Item records
+"""
+class ItemStore():
+	def __init__(self, items):
+		self.items = list(items)
+		count = len(self.items)
+		# category name -> code, codes index self.categories
+		self.codes = {}
+		self.categories = []
+		self.dates = np.fromiter((item.date for item in self.items), dtype=np.int32, count=count)
+		self.cents = np.fromiter((item.cents for item in self.items), dtype=np.int64, count=count)
+		self.category_codes = np.fromiter((self._encode(item.category) for item in self.items), dtype=np.int32, count=count)
+
+	def _encode(self, category):
+		code = self.codes.get(category)
+		if code is None:
+			code = self.codes[category] = len(self.categories)
+			self.categories.append(category)
+		return code
+
+	def __len__(self):
+		return len(self.items)
+
+	"""
+	Get boolean mask of items matching filter.
+	Parameters are the same as in filter()
+	"""
+	def mask(self, start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+		return self.spec_mask(
+			models.parse_date(start) if start is not None else -float('inf'),
+			models.parse_date(end) if end is not None else float('inf'),
+			models.parse_cents_bound(minimum_sum),
+			models.parse_cents_bound(maximum_sum),
+			category
+		)
+
+	"""
+	Get boolean mask of items matching parsed filter.
+	first_date, last_date - day ordinals or -inf / inf
+	low, high - sums in integer cents or -inf / inf
+	category - category name or None
+	"""
+	def spec_mask(self, first_date, last_date, low, high, category):
+		mask = np.ones(len(self.items), dtype=bool)
+		if first_date != -float('inf'):
+			mask &= self.dates >= first_date
+		if last_date != float('inf'):
+			mask &= self.dates <= last_date
+		if low != -float('inf'):
+			mask &= self.cents >= low
+		if high != float('inf'):
+			mask &= self.cents <= high
+		if category is not None:
+			code = self.codes.get(category)
+			if code is None:
+				mask[:] = False
+			else:
+				mask &= self.category_codes == code
+		return mask
+
+	"""
+	Get list of items matching filter.
+	start, end - sql dates or None
+	minimum_sum, maximum_sum - sums in currency units
+	category - category name or None
+	"""
+	def filter(self, start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+		items = self.items
+		return [items[i] for i in np.flatnonzero(self.mask(start, end, minimum_sum, maximum_sum, category))]
+
+	""" Get list of items matching parsed filter, parameters are the same as in spec_mask() """
+	def select(self, first_date, last_date, low, high, category):
+		items = self.items
+		return [items[i] for i in np.flatnonzero(self.spec_mask(first_date, last_date, low, high, category))]
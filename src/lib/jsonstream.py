@@ -0,0 +1,52 @@
+import re
+import json
+import codecs
+
+
+_SKIP = re.compile(r'[\s,]*')
+
+
+"""
+Parse JSON array from stream of byte chunks and yield its elements one by one.
+Only unparsed tail of stream is kept in memory
+chunks - iterable of bytes
+max_record_size - max size of one array element in characters,
+	protects from unbounded buffer growth on broken stream
+"""
+def iter_json_array(chunks, max_record_size=1024*1024):
+	decoder = json.JSONDecoder()
+	text_decoder = codecs.getincrementaldecoder('utf-8')()
+	buffer = ''
+	pos = 0
+	started = False
+	finished = False
+	for chunk in chunks:
+		buffer = buffer[pos:] + text_decoder.decode(chunk)
+		pos = 0
+		while True:
+			pos = _SKIP.match(buffer, pos).end()
+			if pos >= len(buffer):
+				break
+			if not started:
+				if buffer[pos] != '[':
+					raise ValueError("JSON array expected")
+				started = True
+				pos += 1
+				continue
+			if buffer[pos] == ']':
+				finished = True
+				break
+			try:
+				record, end = decoder.raw_decode(buffer, pos)
+			except json.JSONDecodeError:
+				record, end = None, None
+			# element at the end of buffer can be incomplete, wait for next chunk
+			if end is None or end >= len(buffer):
+				if len(buffer) - pos > max_record_size:
+					raise ValueError("JSON array element is too large")
+				break
+			yield record
+			pos = end
+		if finished:
+			return
+	raise ValueError("Unexpected end of JSON array")
@@ -0,0 +1,101 @@
+import sys
+import math
+import datetime
+import functools
+from decimal import Decimal, InvalidOperation
+
+
+_MONTHS = {
+	name: i + 1 for i, name in enumerate(
+		["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+	)
+}
+
+
+"""
+Parse date returned by API ('Tue, 15 Nov 1994 00:00:00 GMT')
+or sql date ('1994-11-15') to day ordinal.
+Items share few distinct dates, so results are cached
+"""
+@functools.lru_cache(maxsize=8192)
+def parse_date(value) -> int:
+	parts = value.split()
+	if len(parts) >= 4 and parts[2] in _MONTHS:
+		return datetime.date(int(parts[3]), _MONTHS[parts[2]], int(parts[1])).toordinal()
+	y, m, d = value.strip().split('-')
+	return datetime.date(int(y), int(m), int(d)).toordinal()
+
+
+""" Parse sum (int, float or string like '12.50') to integer cents """
+def parse_cents(value) -> int:
+	if isinstance(value, int):
+		return value*100
+	try:
+		return int((Decimal(str(value).strip().replace(',', '.'))*100).to_integral_value())
+	except InvalidOperation:
+		raise ValueError(f"Invalid sum: {value}")
+
+
+"""
+Parse sum bound of filter to integer cents, infinite bounds are kept as is.
+Float bounds must not be compared with cents as value*100 (1.1*100 != 110)
+"""
+def parse_cents_bound(value):
+	if isinstance(value, float) and math.isinf(value):
+		return value
+	return parse_cents(value)
+
+
+""" Format integer cents as sum text ('12', '12.50') """
+def cents_to_text(cents: int) -> str:
+	sign = '-' if cents < 0 else ''
+	whole, part = divmod(abs(cents), 100)
+	if part == 0:
+		return f"{sign}{whole}"
+	return f"{sign}{whole}.{part:02d}"
+
+
+"""
+Item record of loaded list.
+Date and sum are parsed once when list is loaded:
+date - day ordinal (datetime.date.toordinal)
+cents - sum in integer cents
+"""
+class Item():
+	__slots__ = ('id', 'category', 'date', 'cents', 'file_name')
+
+	def __init__(self, id, category, date, cents, file_name=''):
+		self.id = id
+		self.category = category
+		self.date = date
+		self.cents = cents
+		self.file_name = file_name
+
+	""" Build item from API json record """
+	@classmethod
+	def from_json(cls, record):
+		return cls(
+			int(record['id']),
+			# category names repeat a lot, keep one string object per name
+			sys.intern(record['category']),
+			parse_date(record['creation_date']),
+			parse_cents(record['sum']),
+			record.get('file_name') or ''
+		)
+
+	""" Date as shown in table (dd.mm.yyyy) """
+	@property
+	def date_text(self):
+		return datetime.date.fromordinal(self.date).strftime('%d.%m.%Y')
+
+	""" Date in API format, as expected by item edit view """
+	@property
+	def creation_date(self):
+		return datetime.date.fromordinal(self.date).strftime('%a, %d %b %Y 00:00:00 GMT')
+
+	@property
+	def sum_text(self):
+		return cents_to_text(self.cents)
+
+	def __repr__(self):
+		return f"Item(id={self.id}, category={self.category!r}, date={self.date_text}, sum={self.sum_text})"
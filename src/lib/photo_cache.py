@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from lib.timer import Debouncer
+
+
+"""
+Persistent on-disk cache for item photos
+photos are stored once per content hash (blobs/<sha256><ext>),
+index maps item id to blob and is kept in index.json.
+When total size exceeds budget least recently used blobs are evicted.
+Index is saved shortly after every change, so photos loaded before crash are not lost.
+root - cache directory
+budget - max size of stored photos in bytes
+"""
+class PhotoCache():
+	# seconds after last change when index is saved
+	SAVE_DELAY = 1.0
+
+	def __init__(self, root, budget=512*1024*1024):
+		self.root = root
+		self.blobs_path = os.path.join(root, 'blobs')
+		self.index_path = os.path.join(root, 'index.json')
+		# partial downloads, kept between sessions to be resumed
+		self.downloads_path = os.path.join(root, 'downloads')
+		self.budget = budget
+		self._lock = threading.RLock()
+		# item id -> content hash
+		self.items = {}
+		# content hash -> {"ext", "size", "atime"}
+		self.blobs = {}
+		# item id -> cache validators of server response {"etag", "last_modified"}
+		self.validators = {}
+		self.size = 0
+		self._dirty = False
+		self._saver = Debouncer(self.SAVE_DELAY, self.save)
+		os.makedirs(self.blobs_path, exist_ok=True)
+		os.makedirs(self.downloads_path, exist_ok=True)
+		self.load()
+
+	""" Path for downloading photo of item before it is put into cache """
+	def download_path(self, item_id):
+		return os.path.join(self.downloads_path, str(item_id))
+
+	def blob_path(self, hash_):
+		return os.path.join(self.blobs_path, hash_ + self.blobs[hash_]["ext"])
+
+	""" Load index from disk and drop entries which files are missing """
+	def load(self):
+		try:
+			with open(self.index_path) as f:
+				index = json.load(f)
+			self.items = {str(k): v for k, v in index.get("items", {}).items()}
+			self.blobs = index.get("blobs", {})
+			self.validators = index.get("validators", {})
+		except (OSError, ValueError):
+			self.items, self.blobs, self.validators = {}, {}, {}
+
+		self.blobs = {h: b for h, b in self.blobs.items() if os.path.isfile(os.path.join(self.blobs_path, h + b["ext"]))}
+		self.items = {i: h for i, h in self.items.items() if h in self.blobs}
+		self.validators = {i: v for i, v in self.validators.items() if i in self.items}
+		known_files = set(h + b["ext"] for h, b in self.blobs.items())
+		# blobs written after last index save
+		for name in os.listdir(self.blobs_path):
+			if name not in known_files:
+				os.remove(os.path.join(self.blobs_path, name))
+		self.size = sum(b["size"] for b in self.blobs.values())
+		print(f"> Photo cache: {len(self.items)} photos, {self.size} bytes")
+
+	def save(self):
+		with self._lock:
+			if not self._dirty:
+				return
+			tmp_path = self.index_path + '.part'
+			with open(tmp_path, 'w') as f:
+				json.dump({"items": self.items, "blobs": self.blobs, "validators": self.validators}, f)
+			os.replace(tmp_path, self.index_path)
+			self._dirty = False
+
+	def __contains__(self, item_id):
+		return str(item_id) in self.items
+
+	""" Get path to cached photo of item or None """
+	def get(self, item_id):
+		with self._lock:
+			hash_ = self.items.get(str(item_id))
+			if hash_ is None:
+				return None
+			self.blobs[hash_]["atime"] = time.time()
+			self._dirty = True
+			return self.blob_path(hash_)
+
+	""" Get content hash of cached photo of item or None """
+	def content_hash(self, item_id):
+		with self._lock:
+			return self.items.get(str(item_id))
+
+	""" Check that photo with content hash is still stored """
+	def has_blob(self, hash_):
+		with self._lock:
+			return hash_ in self.blobs
+
+	""" Get cache validators of server response for item photo """
+	def get_validators(self, item_id):
+		with self._lock:
+			return self.validators.get(str(item_id))
+
+	"""
+	Store photo of item.
+	content - photo binary data
+	file_name - original file name, its extension is kept for system viewer
+	validators - cache validators of server response
+	"""
+	def put(self, item_id, content, file_name='', validators=None):
+		tmp_path = os.path.join(self.downloads_path, f"{item_id}.{threading.get_ident()}.tmp")
+		with open(tmp_path, 'wb') as f:
+			f.write(content)
+		return self.put_file(item_id, tmp_path, file_name, validators)
+
+	"""
+	Store photo of item from file, file is moved into cache.
+	Other parameters are the same as in put()
+	"""
+	def put_file(self, item_id, file_path, file_name='', validators=None):
+		sha = hashlib.sha256()
+		with open(file_path, 'rb') as f:
+			for chunk in iter(lambda: f.read(1024*1024), b''):
+				sha.update(chunk)
+		hash_ = sha.hexdigest()
+		size = os.path.getsize(file_path)
+		with self._lock:
+			if hash_ not in self.blobs:
+				ext = os.path.splitext(file_name)[1].lower()
+				os.replace(file_path, os.path.join(self.blobs_path, hash_ + ext))
+				self.blobs[hash_] = {"ext": ext, "size": size, "atime": time.time()}
+				self.size += size
+			else:
+				os.remove(file_path)
+				self.blobs[hash_]["atime"] = time.time()
+			old_hash = self.items.get(str(item_id))
+			self.items[str(item_id)] = hash_
+			if validators:
+				self.validators[str(item_id)] = validators
+			else:
+				self.validators.pop(str(item_id), None)
+			if old_hash is not None and old_hash != hash_:
+				self._remove_unused(old_hash)
+			self._changed()
+			self.evict(keep=hash_)
+			return self.blob_path(hash_)
+
+	"""
+	Store copy of photo file of item, e.g. photo just sent to server.
+	Source file is kept
+	"""
+	def put_copy(self, item_id, file_path):
+		copy_path = os.path.join(self.downloads_path, f"{item_id}.{threading.get_ident()}.copy")
+		shutil.copyfile(file_path, copy_path)
+		return self.put_file(item_id, copy_path, os.path.basename(file_path))
+
+	""" Remove cached photo of item """
+	def discard(self, item_id):
+		with self._lock:
+			hash_ = self.items.pop(str(item_id), None)
+			self.validators.pop(str(item_id), None)
+			if hash_ is not None:
+				self._remove_unused(hash_)
+				self._changed()
+
+	""" Remove entries of items that are not in alive_ids (deleted on server) """
+	def prune(self, alive_ids):
+		alive = set(str(i) for i in alive_ids)
+		with self._lock:
+			for item_id in [i for i in self.items if i not in alive]:
+				self.discard(item_id)
+		self.save()
+
+	""" Remove least recently used blobs until cache fits into budget """
+	def evict(self, keep=None):
+		with self._lock:
+			if self.size <= self.budget:
+				return
+			for hash_ in sorted(self.blobs, key=lambda h: self.blobs[h]["atime"]):
+				if self.size <= self.budget:
+					break
+				if hash_ == keep:
+					continue
+				for item_id in [i for i, h in self.items.items() if h == hash_]:
+					del self.items[item_id]
+					self.validators.pop(item_id, None)
+				self._remove_blob(hash_)
+			self._dirty = True
+
+	""" Mark index as changed and schedule its saving """
+	def _changed(self):
+		self._dirty = True
+		self._saver.call()
+
+	def _remove_unused(self, hash_):
+		if hash_ not in self.items.values():
+			self._remove_blob(hash_)
+
+	def _remove_blob(self, hash_):
+		path = self.blob_path(hash_)
+		self.size -= self.blobs.pop(hash_)["size"]
+		try:
+			os.remove(path)
+		except OSError:
+			pass
@@ -0,0 +1,141 @@
+import threading
+from lib.download import download
+from concurrent.futures import ThreadPoolExecutor
+
+
+"""
+Class for loading item photos from server to local photo cache
+photos are loaded on demand, prefetch runs on bounded worker pool
+api - shared ApiClient
+cache - PhotoCache for loaded photos
+workers - max number of parallel downloads
+"""
+class PhotoLoader():
+	def __init__(self, api, cache, workers=4):
+		self.api = api
+		self.cache = cache
+		self.workers = max(1, int(workers))
+		self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="photo")
+		self._lock = threading.Lock()
+		# item id -> future of queued or running download
+		self._futures = {}
+		# ids of cached photos checked with server in this session
+		self._validated = set()
+		# item id -> [lock of its download file, number of threads using it]
+		self._loading = {}
+		self.loaded_count = 0
+
+	""" 
+	Load file image from server and save it to photo cache.
+	Cached photo is revalidated with conditional request and is not loaded again if not modified.
+	Photo is streamed to disk, interrupted download is resumed
+	on_progress - function(done, total) of download, see lib.download
+	"""
+	def load(self, item, on_progress=None):
+		with self._lock:
+			entry = self._loading.setdefault(item.id, [threading.Lock(), 0])
+			entry[1] += 1
+		try:
+			with entry[0]:
+				# photo could be loaded by other thread while waiting
+				if self.is_valid(item):
+					return self.cache.get(item.id)
+				return self._load(item, on_progress)
+		finally:
+			with self._lock:
+				entry[1] -= 1
+				if entry[1] == 0:
+					del self._loading[item.id]
+
+	def _load(self, item, on_progress):
+		cached_path = self.cache.get(item.id)
+		headers = {}
+		validators = self.cache.get_validators(item.id) if cached_path is not None else None
+		if validators:
+			if validators.get("etag"):
+				headers['If-None-Match'] = validators["etag"]
+			if validators.get("last_modified"):
+				headers['If-Modified-Since'] = validators["last_modified"]
+		file_path = self.cache.download_path(item.id)
+		resp = download(self.api, f"/files/{item.id}", file_path, headers=headers, on_progress=on_progress)
+		if resp.status_code == 304 and cached_path is not None:
+			path = cached_path
+		elif resp.status_code in [200, 206]:
+			path = self.cache.put_file(item.id, file_path, item.file_name, validators=self.api.validators(resp))
+		else:
+			return None
+		with self._lock:
+			self._validated.add(item.id)
+			self.loaded_count += 1
+		return path
+
+	""" Mark cached photos of changed items to be checked with server again """
+	def expire(self, ids):
+		with self._lock:
+			self._validated.difference_update(ids)
+
+	def is_valid(self, item):
+		return item.id in self._validated and item.id in self.cache
+
+	"""
+	Get path to local photo.
+	Waits for queued download or loads photo right away if it was not loaded yet
+	"""
+	def get(self, item):
+		with self._lock:
+			future = self._futures.get(item.id)
+		if future is not None and not future.cancelled():
+			path = future.result()
+			if path is not None:
+				return path
+		if self.is_valid(item):
+			return self.cache.get(item.id)
+		try:
+			path = self.load(item)
+		except Exception as e:
+			print(f"Exception while loading photo id={item.id}: {e}")
+			path = None
+		# server is not available - use cached photo as is
+		return path or self.cache.get(item.id)
+
+	"""
+	Load photos of items in background.
+	Already loaded photos are skipped, queued downloads of items
+	that are not in list anymore are cancelled.
+	on_progress(loaded, pending) - called from worker thread after each photo
+	"""
+	def prefetch(self, items, on_progress=None):
+		wanted = set(item.id for item in items)
+
+		def task(item):
+			try:
+				return self.load(item)
+			except Exception as e:
+				print(f"Exception while loading photo id={item.id}: {e}")
+			finally:
+				with self._lock:
+					self._futures.pop(item.id, None)
+					loaded, pending = self.loaded_count, len(self._futures)
+				if on_progress is not None:
+					on_progress(loaded, pending)
+
+		with self._lock:
+			for id_, future in list(self._futures.items()):
+				if id_ not in wanted and future.cancel():
+					del self._futures[id_]
+			for item in items:
+				if item.id in self._futures or self.is_valid(item):
+					continue
+				self._futures[item.id] = self.executor.submit(task, item)
+			return len(self._futures)
+
+	""" Cancel downloads that have not started yet """
+	def cancel(self):
+		with self._lock:
+			for id_, future in list(self._futures.items()):
+				if future.cancel():
+					del self._futures[id_]
+
+	def shutdown(self):
+		self.cancel()
+		self.executor.shutdown(wait=False)
@@ -0,0 +1,174 @@
+import io
+import os
+import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2 as cv
+import numpy as np
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from lib import models
+
+
+# fonts with cyrillic glyphs, first existing one is used if font is not set in config
+FONT_CANDIDATES = [
+	"C:\\Windows\\Fonts\\arial.ttf",
+	"/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+	"/usr/share/fonts/TTF/DejaVuSans.ttf",
+	"/usr/share/fonts/dejavu/DejaVuSans.ttf",
+	"/Library/Fonts/Arial.ttf",
+	"/System/Library/Fonts/Supplemental/Arial.ttf",
+]
+
+MARGIN = 40
+ROW_HEIGHT = 140
+PHOTO_WIDTH = 160
+PHOTO_HEIGHT = 120
+HEADER_HEIGHT = 70
+
+
+""" Register TTF font for report and get its name, Helvetica is used if no font is found """
+def register_font(font_path=None):
+	for path in [font_path] + FONT_CANDIDATES:
+		if path and os.path.isfile(path):
+			name = 'Report-' + os.path.splitext(os.path.basename(path))[0]
+			if name not in pdfmetrics.getRegisteredFontNames():
+				pdfmetrics.registerFont(TTFont(name, path))
+			return name
+	print("> Report : font with cyrillic glyphs not found, set REPORT_FONT in config")
+	return 'Helvetica'
+
+
+"""
+Local PDF report about items
+made from loaded item data and photos from local photo cache.
+Photos are loaded and downscaled to report size in worker threads
+(OpenCV releases GIL), only a window of prepared photos is kept in memory,
+pages are drawn in order as their photos become ready.
+Downscaled photos are embedded as JPEG without recompression.
+photos - PhotoLoader
+workers - number of photo preparing threads
+photo_size - max side of embedded photo in pixels
+quality - JPEG quality of embedded photos
+font_path - path of TTF font with cyrillic glyphs or None
+"""
+class ReportBuilder():
+	def __init__(self, photos, workers=4, photo_size=600, quality=80, font_path=None):
+		self.photos = photos
+		self.workers = workers
+		self.photo_size = photo_size
+		self.quality = quality
+		self.font_path = font_path
+		self._font = None
+
+	@property
+	def font(self):
+		if self._font is None:
+			self._font = register_font(self.font_path)
+		return self._font
+
+	""" Get photo of item as (jpeg bytes, width, height) of report size or None """
+	def prepare_photo(self, item):
+		path = self.photos.get(item)
+		if path is None:
+			return None
+		# imread can't open non-ascii paths on windows
+		frame = cv.imdecode(np.fromfile(path, dtype=np.uint8), cv.IMREAD_COLOR)
+		if frame is None:
+			return None
+		height, width = frame.shape[:2]
+		scale = self.photo_size / max(height, width)
+		if scale < 1:
+			width, height = max(1, int(width*scale)), max(1, int(height*scale))
+			frame = cv.resize(frame, (width, height), interpolation=cv.INTER_AREA)
+		ok, buffer = cv.imencode('.jpg', frame, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+		if not ok:
+			return None
+		return buffer.tobytes(), width, height
+
+	def draw_header(self, pdf, items):
+		width, height = A4
+		total = sum(item.cents for item in items)
+		pdf.setFont(self.font, 16)
+		pdf.drawString(MARGIN, height - MARGIN - 16, "Отчет")
+		pdf.setFont(self.font, 10)
+		pdf.drawString(MARGIN, height - MARGIN - 36, f"Сформирован: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M')}")
+		pdf.drawString(MARGIN, height - MARGIN - 52, f"Позиций: {len(items)}, сумма: {models.cents_to_text(total)}")
+
+	def draw_row(self, pdf, item, photo, top):
+		if photo is not None:
+			data, width, height = photo
+			scale = min(PHOTO_WIDTH / width, PHOTO_HEIGHT / height)
+			pdf.drawImage(
+				ImageReader(io.BytesIO(data)), MARGIN, top - height*scale,
+				width=width*scale, height=height*scale
+			)
+		else:
+			pdf.rect(MARGIN, top - PHOTO_HEIGHT, PHOTO_WIDTH, PHOTO_HEIGHT)
+			pdf.setFont(self.font, 9)
+			pdf.drawString(MARGIN + 10, top - PHOTO_HEIGHT/2, "Нет фото")
+		x = MARGIN + PHOTO_WIDTH + 20
+		pdf.setFont(self.font, 11)
+		pdf.drawString(x, top - 14, f"№ {item.id}")
+		pdf.drawString(x, top - 32, f"Дата: {item.date_text}")
+		pdf.drawString(x, top - 50, f"Категория: {item.category}")
+		pdf.drawString(x, top - 68, f"Сумма: {item.sum_text}")
+
+	def draw_footer(self, pdf, number):
+		pdf.setFont(self.font, 9)
+		pdf.drawRightString(A4[0] - MARGIN, MARGIN/2, f"Стр. {number}")
+
+	"""
+	Build report file.
+	File is written under temporary name and renamed when it is complete
+	items - list of lib.models.Item
+	path - path of pdf file
+	on_progress - function(done, total) called after every page
+	Returns path of report
+	"""
+	def build(self, items, path, on_progress=None):
+		items = list(items)
+		tmp_path = path + '.part'
+		window = self.workers*4
+		pdf = canvas.Canvas(tmp_path, pagesize=A4)
+		pdf.setTitle("Отчет")
+		try:
+			with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report') as executor:
+				queue = deque()
+				submitted = 0
+				page = 1
+				self.draw_header(pdf, items)
+				top = A4[1] - MARGIN - HEADER_HEIGHT
+				for i, item in enumerate(items):
+					while submitted < len(items) and submitted < i + window:
+						queue.append(executor.submit(self.prepare_photo, items[submitted]))
+						submitted += 1
+					try:
+						photo = queue.popleft().result()
+					except Exception as e:
+						print(f"Exception while preparing photo id={item.id}: {e}")
+						photo = None
+					if top - ROW_HEIGHT < MARGIN:
+						self.draw_footer(pdf, page)
+						pdf.showPage()
+						page += 1
+						top = A4[1] - MARGIN
+						if on_progress is not None:
+							on_progress(i, len(items))
+					self.draw_row(pdf, item, photo, top)
+					top -= ROW_HEIGHT
+				self.draw_footer(pdf, page)
+				pdf.showPage()
+				pdf.save()
+			os.replace(tmp_path, path)
+		finally:
+			if os.path.isfile(tmp_path):
+				os.remove(tmp_path)
+		if on_progress is not None:
+			on_progress(len(items), len(items))
+		return path
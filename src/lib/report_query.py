@@ -0,0 +1,78 @@
+import gzip
+import json
+import math
+
+
+"""
+Range-encode list of ids.
+Sorted unique ids are split into runs of consecutive ids,
+each run is written as (gap from end of previous run, run length)
+"""
+def encode_id_ranges(ids):
+	values = []
+	previous_end = 0
+	run_start = None
+	run_length = 0
+	for id in sorted(set(ids)):
+		if run_start is not None and id == run_start + run_length:
+			run_length += 1
+			continue
+		if run_start is not None:
+			values += [run_start - previous_end, run_length]
+			previous_end = run_start + run_length
+		run_start, run_length = id, 1
+	if run_start is not None:
+		values += [run_start - previous_end, run_length]
+	return values
+
+
+""" Decode ids written by encode_id_ranges """
+def decode_id_ranges(values):
+	ids = []
+	end = 0
+	for i in range(0, len(values) - 1, 2):
+		start = end + values[i]
+		end = start + values[i + 1]
+		ids.extend(range(start, end))
+	return ids
+
+
+"""
+Get json filter spec for report request.
+start, end - sql dates or None
+minimum_sum, maximum_sum - sums in currency units
+category - category name or None
+"""
+def filter_spec(start=None, end=None, minimum_sum=0, maximum_sum=float('inf'), category=None):
+	return {
+		"start": start,
+		"end": end,
+		"min_sum": minimum_sum if math.isfinite(minimum_sum) else None,
+		"max_sum": maximum_sum if math.isfinite(maximum_sum) else None,
+		"category": category
+	}
+
+
+"""
+Get keyword arguments (body and headers) of report request.
+Server resolves filter spec itself, so only it is sent if it is known,
+otherwise ids are sent range-encoded in gzip compressed body.
+filter_params - (start, end, minimum_sum, maximum_sum, category) of filter
+	that selected items, () for all items, None if unknown
+items - reported items
+"""
+def report_request(filter_params, items):
+	if filter_params is not None:
+		# empty filter selects all items
+		body = {"filter": filter_spec(*filter_params) if filter_params else {}}
+	else:
+		body = {"id_ranges": encode_id_ranges(item.id for item in items)}
+	return {
+		"data": gzip.compress(json.dumps(body, ensure_ascii=False).encode('utf-8')),
+		"headers": {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+	}
+
+
+""" Get keyword arguments of report request with plain id list, for servers without compact requests support """
+def legacy_report_request(items):
+	return {"json": {"id_list": [item.id for item in items]}}
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+
+
+"""
+Items of list in order given by permutation,
+records are taken from list only when they are accessed
+items - list of records
+order - numpy array of positions in items
+"""
+class SortedItems(Sequence):
+	def __init__(self, items, order):
+		self.items = items
+		self.order = order
+
+	def __len__(self):
+		return len(self.order)
+
+	def __getitem__(self, i):
+		items = self.items
+		if isinstance(i, slice):
+			return [items[j] for j in self.order[i].tolist()]
+		return items[int(self.order[i])]
+
+
+"""
+Stable multi-key sorting of loaded items by date, category and sum.
+Sort keys of every column are computed once per loaded list,
+permutations of recent sort orders are cached, so re-sorting is a lookup.
+Sort spec is list of (column, ascending) pairs, first one is primary key,
+ties of all keys keep order of loaded list.
+"""
+class ItemSorter():
+	COLUMNS = ('date', 'category', 'sum')
+	# number of cached permutations
+	CACHE_SIZE = 8
+
+	def __init__(self, items=None):
+		self.reset(items or [])
+
+	""" Use new item list, drops keys and permutations of previous one """
+	def reset(self, items):
+		self.items = items
+		self._keys = {}
+		self._permutations = OrderedDict()
+		self._ranks = {}
+		self._positions = None
+
+	""" Get sort keys of column as numpy array aligned with items """
+	def keys(self, column):
+		keys = self._keys.get(column)
+		if keys is not None:
+			return keys
+		items = self.items
+		if column == 'date':
+			keys = np.fromiter((item.date for item in items), dtype=np.int64, count=len(items))
+		elif column == 'sum':
+			keys = np.fromiter((item.cents for item in items), dtype=np.int64, count=len(items))
+		elif column == 'category':
+			# categories are compared by rank of name
+			ranks = {name: i for i, name in enumerate(sorted(set(item.category for item in items)))}
+			keys = np.fromiter((ranks[item.category] for item in items), dtype=np.int64, count=len(items))
+		else:
+			raise ValueError(f"Unknown sort column: {column}")
+		self._keys[column] = keys
+		return keys
+
+	""" Get positions of items in sorted order """
+	def permutation(self, spec):
+		spec = tuple(spec)
+		permutation = self._permutations.get(spec)
+		if permutation is not None:
+			self._permutations.move_to_end(spec)
+			return permutation
+		# lexsort uses last key as primary one
+		keys = [self.keys(column) if ascending else -self.keys(column) for column, ascending in reversed(spec)]
+		permutation = np.lexsort(keys)
+		self._permutations[spec] = permutation
+		if len(self._permutations) > self.CACHE_SIZE:
+			evicted, _ = self._permutations.popitem(last=False)
+			self._ranks.pop(evicted, None)
+		return permutation
+
+	""" Get place of every item in sorted order """
+	def ranks(self, spec):
+		spec = tuple(spec)
+		permutation = self.permutation(spec)
+		ranks = self._ranks.get(spec)
+		if ranks is None:
+			ranks = np.empty_like(permutation)
+			ranks[permutation] = np.arange(len(permutation))
+			self._ranks[spec] = ranks
+		return ranks
+
+	"""
+	Sort records by spec.
+	records - loaded item list or its part (filter result)
+	Returns sequence of records in sorted order
+	"""
+	def sort(self, records, spec):
+		if not spec or not records:
+			return records
+		if records is self.items:
+			return SortedItems(self.items, self.permutation(spec))
+		if self._positions is None:
+			self._positions = {item.id: i for i, item in enumerate(self.items)}
+		positions = np.fromiter((self._positions[item.id] for item in records), dtype=np.int64, count=len(records))
+		order = positions[np.argsort(self.ranks(spec)[positions], kind='stable')]
+		return SortedItems(self.items, order)
+
+
+"""
+Get new sort spec after click on column header:
+clicked primary column changes direction, other column becomes primary
+and previous keys are kept as secondary ones
+"""
+def toggle_sort(spec, column, max_keys=3):
+	if spec and spec[0][0] == column:
+		return [(column, not spec[0][1])] + spec[1:]
+	return ([(column, True)] + [key for key in spec if key[0] != column])[:max_keys]
@@ -1,23 +1,66 @@
 import cv2 as cv
+import numpy as np
 import base64
+import threading
+import time
+
+
+# JPEG quality of preview frames
+PREVIEW_QUALITY = 80
 
 
 """ 
 Class for capturing frames from camera
-creates opencv VideoCapture object and gets frams from it
+creates opencv VideoCapture object and reads frames from it in capture thread.
+Only the latest frame is kept (single-slot buffer), so slow preview or encoding
+never makes frames queue up: readers always get the newest frame without waiting
+for camera, frames replaced before anyone took them are counted as dropped.
+Capture thread is started on first request of frame.
 src - video source (0/-1 = device camera)
 """
 class Stream():
 	def __init__(self, src=0):
+		self._lock = threading.Lock()
+		self._thread = None
+		self._running = False
 		self.create_stream(src)
 		self.frame_shape = None
 
-	def get_frame_raw(self):
+	def _capture(self):
+		while self._running:
+			ret, frame = self.cap.read()
+			if not ret:
+				time.sleep(0.01)
+				continue
+			with self._lock:
+				if self._frame is not None and self._taken < self._sequence:
+					self.dropped += 1
+				self._frame = frame
+				self._sequence += 1
+				self.captured += 1
+
+	def _start_capture(self):
+		with self._lock:
+			if self._running or not self.available:
+				return
+			self._running = True
+			self._thread = threading.Thread(target=self._capture, daemon=True, name="capture")
+			self._thread.start()
+
+	"""
+	Get latest captured frame, doesn't wait for camera.
+	only_new - return False if latest frame was already taken
+	Returns frame or False if there is no (new) frame
+	"""
+	def get_frame_raw(self, only_new=False):
 		if not self.available:
 			return False
-		ret, frame = self.cap.read()
-		if not ret:
-			return False
+		self._start_capture()
+		with self._lock:
+			if self._frame is None or (only_new and self._taken == self._sequence):
+				return False
+			self._taken = self._sequence
+			frame = self._frame
 		self.frame_shape = frame.shape[:2]
 		return frame
 
@@ -25,18 +68,76 @@ class Stream():
 		_, buffer = cv.imencode('.jpg', frame)
 		return base64.b64encode(buffer).decode('utf-8')
 
-	# frame in base64 encoding
+	# frame in base64 encoding, None if there is no frame
 	def get_frame(self):
-		return self.to_base64(self.apply_filter(self.get_frame_raw(), mask=False))
+		frame = self.get_frame_raw()
+		if frame is False:
+			return None
+		return self.to_base64(self.apply_filter(frame, mask=False))
 
+	"""
+	Get frame for preview in base64 encoding, None if there is no (new) frame.
+	Frame is downscaled to preview size first and enhanced after that,
+	blur sigma is scaled with frame so preview looks like enhanced full frame.
+	Output arrays are allocated once per frame size and reused.
+	only_new - return None if latest frame was already taken
+	size - max side of preview frame
+	"""
+	def get_preview(self, only_new=True, size=600):
+		frame = self.get_frame_raw(only_new)
+		if frame is False:
+			return None
+		height, width = frame.shape[:2]
+		scale = min(1.0, size / max(height, width))
+		# channels are kept as they are, single-channel cameras give 2-D frames
+		shape = (max(1, int(height*scale)), max(1, int(width*scale))) + frame.shape[2:]
+		if self._preview_shape != shape:
+			self._preview_shape = shape
+			self._preview_buffers = [np.empty(shape, dtype=np.uint8) for _ in range(3)]
+		small, blurred, sharpened = self._preview_buffers
+		if scale < 1:
+			# area interpolation costs more than the whole rest of pipeline, linear is enough for preview
+			cv.resize(frame, (shape[1], shape[0]), dst=small, interpolation=cv.INTER_LINEAR)
+		else:
+			np.copyto(small, frame)
+		cv.GaussianBlur(small, (0, 0), max(0.5, 2.0*scale), dst=blurred)
+		cv.addWeighted(small, 2.0, blurred, -1.0, 0, dst=sharpened)
+		_, buffer = cv.imencode('.jpg', sharpened, [cv.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+		return base64.b64encode(buffer).decode('utf-8')
+
+	""" Numbers of captured frames and frames dropped without being taken """
+	def stats(self):
+		with self._lock:
+			return {"captured": self.captured, "dropped": self.dropped}
+
+	"""
+	Stop capture thread and release camera.
+	Stream is marked unavailable under lock first, so concurrent reader can't start capture again
+	"""
 	def release(self):
-		if self.available:
-			self.cap.release()
+		with self._lock:
+			available = self.available
 			self.available = False
+			self._running = False
+			thread, self._thread = self._thread, None
+		if thread is not None:
+			thread.join()
+		if available:
+			self.cap.release()
 
 	def create_stream(self, src=0):
 		self.cap = cv.VideoCapture(src)
 		self.available = self.cap.isOpened()
+		# single-slot buffer of latest frame and its number
+		self._frame = None
+		self._sequence = 0
+		# number of latest taken frame
+		self._taken = 0
+		self.captured = 0
+		self.dropped = 0
+		# reused output arrays of preview pipeline
+		self._preview_shape = None
+		self._preview_buffers = None
 
 	def apply_filter(self, frame, mask=False):
 		gaussian = cv.GaussianBlur(frame, (0, 0), 2.0)
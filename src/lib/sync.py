@@ -0,0 +1,100 @@
+from lib.jsonstream import iter_json_array
+from lib.models import Item
+from lib.item_index import ItemIndex
+
+
+"""
+Incremental synchronization of item list
+first load gets full list (/item/all), next refreshes ask server only for changes
+since last sync cursor (/item/changes?since=cursor) and merge them into loaded list.
+If server doesn't support changes feed, full list is loaded on every refresh.
+Items are kept as lib.models.Item records, filtering indexes (index)
+are updated together with list.
+api - shared ApiClient
+http_cache - ResponseCache for full list
+"""
+class ItemSync():
+	def __init__(self, api, http_cache):
+		self.api = api
+		self.http_cache = http_cache
+		self.items = None
+		self.cursor = None
+		self.delta_supported = True
+		# ids of items changed by last refresh
+		self.changed_ids = []
+		# item id -> position in items list
+		self._positions = {}
+		self.index = ItemIndex()
+
+	"""
+	Load full item list.
+	List is streamed and parsed item by item,
+	on_batch(items) is called with loaded part of list after every batch_size items
+	"""
+	def full(self, on_batch=None, batch_size=500):
+		chunks, headers = self.http_cache.stream('/item/all')
+		if chunks is None:
+			return None
+		items = []
+		positions = {}
+		for record in iter_json_array(chunks):
+			item = Item.from_json(record)
+			positions[item.id] = len(items)
+			items.append(item)
+			if on_batch is not None and len(items) % batch_size == 0:
+				on_batch(items)
+		self.items = items
+		self._positions = positions
+		self.index.rebuild(items)
+		self.cursor = headers.get('X-Sync-Cursor')
+		self.changed_ids = list(self._positions)
+		print(f"> Sync : full list loaded, {len(self.items)} items")
+		return self.items
+
+	""" 
+	Get changes since last sync and merge them into loaded list.
+	on_batch - see full()
+	Returns list of items or None if request failed
+	"""
+	def refresh(self, on_batch=None):
+		if self.items is None or self.cursor is None or not self.delta_supported:
+			return self.full(on_batch)
+		resp = self.api.get('/item/changes', params={'since': self.cursor})
+		if resp.status_code == 404:
+			print("> Sync : changes feed is not supported by server")
+			self.delta_supported = False
+			return self.full(on_batch)
+		if resp.status_code == 410:
+			# cursor is too old or unknown to server
+			return self.full(on_batch)
+		if resp.status_code not in [200, 204]:
+			return None
+		changes = resp.json()
+		changed = [Item.from_json(record) for record in changes.get("items", [])]
+		self.merge(changed, [int(id) for id in changes.get("deleted", [])])
+		self.cursor = changes["cursor"]
+		self.changed_ids = [item.id for item in changed]
+		print(f"> Sync : {len(changed)} changed, {len(changes.get('deleted', []))} deleted")
+		return self.items
+
+	""" Merge created / updated items and remove deleted ones """
+	def merge(self, changed, deleted):
+		for item in changed:
+			self.index.update(item)
+			position = self._positions.get(item.id)
+			if position is None:
+				self._positions[item.id] = len(self.items)
+				self.items.append(item)
+			else:
+				self.items[position] = item
+		if deleted:
+			deleted = set(deleted)
+			for id in deleted:
+				self.index.remove(id)
+			self.items = [item for item in self.items if item.id not in deleted]
+			self._positions = {item.id: i for i, item in enumerate(self.items)}
+
+	""" Remove item deleted by this client without waiting for next sync """
+	def remove(self, id):
+		if self.items is not None and id in self._positions:
+			self.merge([], [id])
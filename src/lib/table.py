@@ -0,0 +1,230 @@
+import flet as ft
+import threading
+from typing import Callable
+from collections.abc import Sequence
+
+
+"""
+Keeps row controls of displayed records by record key.
+On new list of records existing rows are reused, only rows of changed records are patched,
+rows of removed records are kept for reuse by new records.
+key - function that returns unique key of record
+new_row - function that creates (row control, list of cell controls)
+fill_cells - function(cells, record) that puts record data into cell controls
+"""
+class RowReconciler():
+	def __init__(self, key: Callable, new_row: Callable, fill_cells: Callable):
+		self.key = key
+		self.new_row = new_row
+		self.fill_cells = fill_cells
+		# record key -> [row, cells, record]
+		self.entries = {}
+		# unused [row, cells] for reuse
+		self.free = []
+
+	""" Get row controls for records, in the same order """
+	def reconcile(self, records):
+		entries = {}
+		missing = []
+		for record in records:
+			key = self.key(record)
+			entry = self.entries.pop(key, None)
+			if entry is None:
+				missing.append((key, record))
+				continue
+			if entry[2] is not record and entry[2] != record:
+				self.fill_cells(entry[1], record)
+				entry[2] = record
+			entries[key] = entry
+		self.free.extend(entry[:2] for entry in self.entries.values())
+		for key, record in missing:
+			row, cells = self.free.pop() if self.free else self.new_row()
+			self.fill_cells(cells, record)
+			entries[key] = [row, cells, record]
+		self.entries = entries
+		return [entries[self.key(record)][0] for record in records]
+
+
+"""
+Table with keyed rows.
+On update only rows of added, removed and changed records are sent to UI
+columns - list of column titles
+key, create_cells, fill_cells - see RowReconciler, create_cells returns list of cell controls
+"""
+class KeyedTable(ft.DataTable):
+	def __init__(self, columns, key: Callable, create_cells: Callable, fill_cells: Callable, **kwargs):
+		super().__init__(columns=[ft.DataColumn(ft.Text(title)) for title in columns], rows=[], **kwargs)
+		self.create_cells = create_cells
+		self.reconciler = RowReconciler(key, self.new_row, fill_cells)
+
+	def new_row(self):
+		cells = self.create_cells()
+		return ft.DataRow(cells=[ft.DataCell(cell) for cell in cells]), cells
+
+	""" Show new list of records with one batched update """
+	def set_records(self, records):
+		self.rows = self.reconciler.reconcile(records)
+		try:
+			self.update()
+		except Exception as e:
+			pass
+
+
+"""
+Virtualized table
+creates row controls only for visible window plus buffer and reuses them on scroll
+(rows are keyed, see RowReconciler), so number of controls doesn't depend on number of records
+columns - list of (title, width)
+records can be list or any sequence that returns list for slice
+key - function that returns unique key of record
+create_cells - function that creates list of cell controls for one row
+fill_cells - function(cells, record) that puts record data into cell controls
+row_height - fixed height of row, needed to find visible rows
+height - initial height of visible part of table
+buffer - number of extra rows rendered before and after visible rows
+on_window - function(first, count) called when visible rows change
+sortable - indexes of columns with clickable titles
+on_sort - function(column index) called on click on sortable column title
+"""
+class VirtualTable(ft.Column):
+	def __init__(self, columns, key: Callable, create_cells: Callable, fill_cells: Callable, row_height=48, height=400, buffer=10, on_window: Callable=None, sortable=(), on_sort: Callable=None, **kwargs):
+		super().__init__(spacing=0, **kwargs)
+		self.titles = [title for title, _ in columns]
+		self.widths = [width for _, width in columns]
+		self.create_cells = create_cells
+		self.reconciler = RowReconciler(key, self.new_row, fill_cells)
+		self.row_height = row_height
+		self.viewport = height
+		self.buffer = buffer
+		self.on_window = on_window
+		self.records = []
+		# rows are reused by render, so changes of rendered rows from other threads are made under lock
+		self.lock = threading.RLock()
+		# index of first visible record
+		self.first = 0
+		# index of first record in rendered window
+		self.start = 0
+
+		self.title_texts = [ft.Text(title, weight=ft.FontWeight.BOLD) for title in self.titles]
+		header_cells = []
+		for i, (text, width) in enumerate(zip(self.title_texts, self.widths)):
+			if i in sortable and on_sort is not None:
+				text = ft.GestureDetector(
+					content=text,
+					on_tap=lambda e, i=i: on_sort(i),
+					mouse_cursor=ft.MouseCursor.CLICK
+				)
+			header_cells.append(ft.Container(text, width=width))
+		self.header = ft.Container(
+			content=ft.Row(header_cells),
+			height=row_height
+		)
+		self.top_spacer = ft.Container(height=0)
+		self.bottom_spacer = ft.Container(height=0)
+		self.body = ft.ListView(
+			controls=[self.top_spacer, self.bottom_spacer],
+			height=height,
+			expand=True,
+			on_scroll=self.handle_scroll,
+			on_scroll_interval=50
+		)
+		self.controls = [self.header, self.body]
+
+	@property
+	def visible_count(self):
+		return int(self.viewport // self.row_height) + 1
+
+	def new_row(self):
+		cells = self.create_cells()
+		row = ft.Container(
+			content=ft.Row([ft.Container(cell, width=width) for cell, width in zip(cells, self.widths)]),
+			height=self.row_height
+		)
+		return row, cells
+
+	""" Put records of current window into row controls """
+	def render(self):
+		with self.lock:
+			size = min(self.visible_count + 2*self.buffer, len(self.records))
+			self.start = max(0, min(self.first - self.buffer, len(self.records) - size))
+			rows = self.reconciler.reconcile(self.records[self.start:self.start + size])
+			self.body.controls = [self.top_spacer, *rows, self.bottom_spacer]
+			self.top_spacer.height = self.start*self.row_height
+			self.bottom_spacer.height = (len(self.records) - self.start - size)*self.row_height
+
+	"""
+	Change rendered row of record from any thread.
+	Row can't be reused for other record by render while update runs.
+	key - record key
+	update - function(cells, record) that changes cell controls, returns changed control or None
+	"""
+	def update_row(self, key, update):
+		with self.lock:
+			entry = self.reconciler.entries.get(key)
+			if entry is None:
+				return
+			control = update(entry[1], entry[2])
+			if control is not None:
+				try:
+					control.update()
+				except Exception as e:
+					pass
+
+	"""
+	Show sort direction in column titles.
+	order - list of (column index, ascending), first one is primary key
+	"""
+	def set_sort_marks(self, order):
+		marks = {}
+		for n, (i, ascending) in enumerate(order):
+			arrow = "▲" if ascending else "▼"
+			marks[i] = f"{arrow}{n + 1}" if len(order) > 1 else arrow
+		for i, text in enumerate(self.title_texts):
+			text.value = f"{self.titles[i]} {marks[i]}" if i in marks else self.titles[i]
+		try:
+			self.header.update()
+		except Exception as e:
+			pass
+
+	def try_update(self):
+		try:
+			self.update()
+		except Exception as e:
+			pass
+
+	"""
+	Show new list of records.
+	reset_scroll - scroll table to the first row
+	"""
+	def set_records(self, records, reset_scroll=True):
+		self.records = records if isinstance(records, Sequence) else list(records)
+		if reset_scroll:
+			self.first = 0
+		self.first = max(0, min(self.first, len(self.records) - 1))
+		self.render()
+		self.try_update()
+		if reset_scroll:
+			try:
+				self.body.scroll_to(offset=0, duration=0)
+			except Exception as e:
+				pass
+		if self.on_window is not None:
+			self.on_window(self.first, self.visible_count)
+
+	# not named on_scroll: ft.Column sets on_scroll attribute, which would hide the method
+	def handle_scroll(self, e: ft.OnScrollEvent):
+		self.viewport = e.viewport_dimension or self.viewport
+		first = max(0, int(e.pixels // self.row_height))
+		if first == self.first:
+			return
+		self.first = first
+		# render new window only when visible rows come close to its border
+		margin = self.buffer // 2
+		size = min(self.visible_count + 2*self.buffer, len(self.records))
+		window_end = self.start + size
+		if (self.start > 0 and first < self.start + margin) or \
+			(window_end < len(self.records) and first + self.visible_count > window_end - margin):
+			self.render()
+			self.try_update()
+		if self.on_window is not None:
+			self.on_window(self.first, self.visible_count)
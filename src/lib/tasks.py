@@ -0,0 +1,58 @@
+import functools
+import threading
+
+
+_lock = threading.Lock()
+
+
+""" Show or hide busy state of view and clicked control """
+def set_busy(view, control, busy):
+	if control is not None and hasattr(control, 'disabled'):
+		control.disabled = busy
+		try:
+			control.update()
+		except Exception as e:
+			pass
+	indicator = getattr(view, 'busy_indicator', None)
+	if indicator is not None:
+		indicator.visible = bool(view._in_flight)
+		try:
+			indicator.update()
+		except Exception as e:
+			pass
+
+
+"""
+Decorator for view event handlers that make requests to API.
+Handler runs in background thread so UI stays responsive,
+clicked control is disabled until handler finishes
+and repeated calls with the same arguments (e.g. id of deleted item)
+are ignored while request is in flight, calls for other arguments run.
+View can have busy_indicator control which is shown while any request is in flight
+"""
+def background(handler):
+	@functools.wraps(handler)
+	def wrapper(self, e=None, *args, **kwargs):
+		name = handler.__name__
+		key = (name, repr(args), repr(sorted(kwargs.items())))
+		with _lock:
+			in_flight = self.__dict__.setdefault('_in_flight', set())
+			if key in in_flight:
+				print(f"> {name} : request in flight, call ignored")
+				return
+			in_flight.add(key)
+		control = getattr(e, 'control', None)
+		set_busy(self, control, True)
+
+		def run():
+			try:
+				handler(self, e, *args, **kwargs)
+			except Exception as ex:
+				print(f"Exception in {name}: {ex}")
+			finally:
+				with _lock:
+					in_flight.discard(key)
+				set_busy(self, control, False)
+
+		self.page.run_thread(run)
+	return wrapper
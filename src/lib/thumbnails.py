@@ -0,0 +1,177 @@
+import os
+import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2 as cv
+import numpy as np
+
+
+"""
+Small previews of item photos for table rows.
+Thumbnail is made once per photo content (thumbs/<sha256>.jpg, same hash as in PhotoCache),
+so it is shared by items with the same photo and is made again only when photo changes.
+Recently used thumbnails are kept in memory as base64 strings ready for ft.Image.
+Thumbnails are made in background only for requested (visible) items.
+photos - PhotoLoader, its cache gives photos and their content hashes
+root - directory for thumbnail files
+size - max side of thumbnail in pixels
+quality - JPEG quality of thumbnails
+memory_items - max number of thumbnails kept in memory
+workers - number of threads making thumbnails
+"""
+class Thumbnails():
+	def __init__(self, photos, root, size=96, quality=70, memory_items=512, workers=2):
+		self.photos = photos
+		self.cache = photos.cache
+		self.root = root
+		self.size = size
+		self.quality = quality
+		self.memory_items = memory_items
+		self.executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="thumbnail")
+		self._lock = threading.Lock()
+		# content hash -> base64 of thumbnail, in order of use
+		self._memory = OrderedDict()
+		# item id -> future of queued or running thumbnail task
+		self._futures = {}
+		os.makedirs(root, exist_ok=True)
+
+	def path(self, hash_):
+		return os.path.join(self.root, hash_ + '.jpg')
+
+	def _remember(self, hash_, thumbnail):
+		with self._lock:
+			self._memory[hash_] = thumbnail
+			self._memory.move_to_end(hash_)
+			while len(self._memory) > self.memory_items:
+				self._memory.popitem(last=False)
+
+	""" Get thumbnail of item from memory without touching disk or None """
+	def peek(self, item):
+		hash_ = self.cache.content_hash(item.id)
+		if hash_ is None:
+			return None
+		with self._lock:
+			thumbnail = self._memory.get(hash_)
+			if thumbnail is not None:
+				self._memory.move_to_end(hash_)
+			return thumbnail
+
+	"""
+	Make JPEG thumbnail of photo file.
+	JPEG photos are decoded at 1/4 scale right away, which is much faster
+	than decoding of full resolution for phone photos
+	"""
+	def make(self, photo_path):
+		data = np.fromfile(photo_path, dtype=np.uint8)
+		frame = cv.imdecode(data, cv.IMREAD_REDUCED_COLOR_4)
+		if frame is None or max(frame.shape[:2]) < self.size:
+			frame = cv.imdecode(data, cv.IMREAD_COLOR)
+		if frame is None:
+			return None
+		height, width = frame.shape[:2]
+		scale = self.size / max(height, width)
+		if scale < 1:
+			size = (max(1, int(width*scale)), max(1, int(height*scale)))
+			frame = cv.resize(frame, size, interpolation=cv.INTER_AREA)
+		ok, buffer = cv.imencode('.jpg', frame, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+		return buffer.tobytes() if ok else None
+
+	"""
+	Get thumbnail of item as base64 string or None.
+	Photo is loaded (or revalidated) first, thumbnail is taken from memory,
+	from disk or made from photo, blocks until it is ready
+	"""
+	def get(self, item):
+		photo_path = self.photos.get(item)
+		hash_ = self.cache.content_hash(item.id)
+		if photo_path is None or hash_ is None:
+			return None
+		thumbnail = self.peek(item)
+		if thumbnail is not None:
+			return thumbnail
+		data = self._load(hash_, photo_path)
+		if data is None:
+			return None
+		thumbnail = base64.b64encode(data).decode('utf-8')
+		self._remember(hash_, thumbnail)
+		return thumbnail
+
+	""" Read thumbnail file of content hash or make it from photo, returns JPEG bytes or None """
+	def _load(self, hash_, photo_path):
+		path = self.path(hash_)
+		if os.path.isfile(path):
+			with open(path, 'rb') as f:
+				return f.read()
+		data = self.make(photo_path)
+		if data is not None:
+			tmp_path = f"{path}.{threading.get_ident()}.tmp"
+			with open(tmp_path, 'wb') as f:
+				f.write(data)
+			os.replace(tmp_path, path)
+		return data
+
+	"""
+	Make thumbnail file of cached photo of item in background, e.g. of photo just sent to server.
+	Thumbnail is found by content hash when row of item is shown
+	"""
+	def prepare(self, item_id):
+		def task():
+			try:
+				photo_path = self.cache.get(item_id)
+				hash_ = self.cache.content_hash(item_id)
+				if photo_path is not None and hash_ is not None:
+					self._load(hash_, photo_path)
+			except Exception as e:
+				print(f"Exception while making thumbnail id={item_id}: {e}")
+
+		self.executor.submit(task)
+
+	"""
+	Make thumbnails of items in background.
+	Items with thumbnail in memory and valid photo are skipped,
+	queued tasks of items that are not in list anymore are cancelled.
+	on_ready(item, thumbnail) - called from worker thread for every made thumbnail
+	"""
+	def request(self, items, on_ready):
+		wanted = set(item.id for item in items)
+
+		def task(item):
+			try:
+				thumbnail = self.get(item)
+				if thumbnail is not None:
+					on_ready(item, thumbnail)
+			except Exception as e:
+				print(f"Exception while making thumbnail id={item.id}: {e}")
+			finally:
+				with self._lock:
+					self._futures.pop(item.id, None)
+
+		with self._lock:
+			for id_, future in list(self._futures.items()):
+				if id_ not in wanted and future.cancel():
+					del self._futures[id_]
+		for item in items:
+			if self.photos.is_valid(item) and self.peek(item) is not None:
+				continue
+			with self._lock:
+				if item.id not in self._futures:
+					self._futures[item.id] = self.executor.submit(task, item)
+
+	""" Remove thumbnail files of photos that are not in photo cache anymore """
+	def prune(self):
+		for name in os.listdir(self.root):
+			hash_, ext = os.path.splitext(name)
+			if ext == '.jpg' and not self.cache.has_blob(hash_):
+				try:
+					os.remove(os.path.join(self.root, name))
+				except OSError:
+					pass
+
+	def shutdown(self):
+		with self._lock:
+			for future in self._futures.values():
+				future.cancel()
+			self._futures.clear()
+		self.executor.shutdown(wait=False)
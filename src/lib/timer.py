@@ -33,3 +33,32 @@ class Timer:
             self._thread.join()
             self._thread = None
 
+
+
+"""
+Debouncer class
+calls callback once after calls stopped coming for delay seconds,
+callback gets arguments of the last call
+delay - quiet time in seconds
+callback - handler function
+"""
+class Debouncer:
+    def __init__(self, delay, callback):
+        self._delay = delay
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def call(self, *args, **kwargs):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._delay, self._callback, args, kwargs)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
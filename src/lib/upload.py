@@ -0,0 +1,96 @@
+import os
+import json
+import uuid
+import mimetypes
+from lib import utils
+
+
+"""
+multipart/form-data body with file which is read from disk while request is sent,
+so photo is never held in memory as a whole.
+Body length is known in advance, so request is sent with Content-Length.
+fields - dict of form fields
+file_field - name of file field
+file_path - path of sent file
+"""
+class MultipartBody():
+	def __init__(self, fields, file_field, file_path, chunk_size=64*1024):
+		self.boundary = uuid.uuid4().hex
+		self.file_path = file_path
+		self.chunk_size = chunk_size
+		head = []
+		for name, value in fields.items():
+			head.append(
+				f'--{self.boundary}\r\n'
+				f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+				f'{value}\r\n'
+			)
+		file_name = os.path.basename(file_path)
+		mime = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+		head.append(
+			f'--{self.boundary}\r\n'
+			f'Content-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+			f'Content-Type: {mime}\r\n\r\n'
+		)
+		self.head = ''.join(head).encode('utf-8')
+		self.tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+		self.length = len(self.head) + os.path.getsize(file_path) + len(self.tail)
+
+	@property
+	def content_type(self):
+		return f'multipart/form-data; boundary={self.boundary}'
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		yield self.head
+		with open(self.file_path, 'rb') as f:
+			for chunk in iter(lambda: f.read(self.chunk_size), b''):
+				yield chunk
+		yield self.tail
+
+
+"""
+Sends new and edited items with photo.
+Photo is streamed from file in multipart form, item fields are sent as form fields.
+If server doesn't accept multipart form (400 / 415 / 422 reply), request is repeated
+as JSON with base64 photo and all later requests of session are sent as JSON.
+Other replies are final: item may be stored before server error (5xx), so
+repeated request could create a duplicate.
+Items without photo are sent as JSON with fields only.
+api - ApiClient
+multipart - try multipart requests
+"""
+class ItemUploader():
+	def __init__(self, api, multipart=True):
+		self.api = api
+		self.multipart = multipart
+
+	def send_multipart(self, path, fields, file_path):
+		body = MultipartBody(fields, 'image', file_path)
+		# requests takes Content-Length from len() and sends chunks given by iteration
+		return self.api.post(path, data=body, headers={'Content-Type': body.content_type})
+
+	def send_base64(self, path, fields, file_path):
+		item = dict(fields)
+		item["image"] = utils.encode_base64(file_path)
+		return self.api.post(path, json=item)
+
+	"""
+	Send item.
+	path - api path
+	fields - item fields
+	file_path - path of item photo, None - photo is not sent
+	Returns response
+	"""
+	def send(self, path, fields, file_path=None):
+		if file_path is None:
+			return self.api.post(path, json=dict(fields))
+		if self.multipart:
+			response = self.send_multipart(path, fields, file_path)
+			if response.status_code not in [400, 415, 422]:
+				return response
+			print("> Upload : multipart form is not accepted by server, sending base64 photo")
+			self.multipart = False
+		return self.send_base64(path, fields, file_path)
@@ -5,6 +5,8 @@ import datetime
 import re
 import flet as ft
 import base64
+import math
+from lib import models
 
 """ Encode file to base64 string"""
 def encode_base64(file_path):
@@ -53,6 +55,8 @@ def date_to_sql(date: str):
 		date = f"{y}-{m}-{d}"
 		if not re.fullmatch(r'^\d{4}-(0?[1-9]|1[0-2])-(0?[1-9]|[12]\d|3[01])$', date):
 			return None
+		# day must exist in month
+		datetime.date(int(y), int(m), int(d))
 		return date
 	except Exception:
 		return None
@@ -80,10 +84,14 @@ def pick_file(self, e):
 	)
 
 
-def file_picked(self, e: ft.FilePickerResultEvent):
+"""
+Attach picked file.
+encode - keep base64 of file in view, views which send file from disk don't need it
+"""
+def file_picked(self, e: ft.FilePickerResultEvent, encode=True):
 	if e.files:
 		file = e.files[0]
-		update_attachment_data(self, file.path, file.name, encode_base64(file.path), "picked")
+		update_attachment_data(self, file.path, file.name, encode_base64(file.path) if encode else None, "picked")
 		self.file_name_text.value = f"Выбран файл: {file.name}"
 	else:
 		update_attachment_data(self, None, "Файл не выбран", None, "picked")
@@ -116,17 +124,22 @@ def open_image(image_path):
 		subprocess.run(['xdg-open', image_path])
 
 
+"""
+Filter list of lib.models.Item records.
+start, end - sql dates or None
+minimum_sum, maximum_sum - sums in currency units
+category - category name or None
+"""
 def get_filtered_items(items, start, end, minimum_sum, maximum_sum, category):
 	print(start, end, minimum_sum, maximum_sum, category)
 
-	if start is None and end is None:
-		filtered_by_date_and_sum = [r for r in items if minimum_sum <= int(r['sum']) <= maximum_sum]
-	elif start == None and not end is None:
-		filtered_by_date_and_sum = [r for r in items if date_to_sql(date_to_text(r["creation_date"])) <= end and minimum_sum <= int(r['sum']) <= maximum_sum]
-	else:
-		filtered_by_date_and_sum = [r for r in items if start <= date_to_sql(date_to_text(r["creation_date"])) and minimum_sum <= int(r['sum']) <= maximum_sum]
-	
+	# compare with values parsed at load time: day ordinals and integer cents
+	first = models.parse_date(start) if start is not None else -math.inf
+	last = models.parse_date(end) if end is not None else math.inf
+	low = models.parse_cents_bound(minimum_sum)
+	high = models.parse_cents_bound(maximum_sum)
+
 	if category is None:
-		return filtered_by_date_and_sum
-	return [r for r in filtered_by_date_and_sum if r["category"] == category]
+		return [r for r in items if first <= r.date <= last and low <= r.cents <= high]
+	return [r for r in items if r.category == category and first <= r.date <= last and low <= r.cents <= high]
 
@@ -5,6 +5,15 @@ from views.item_edit_view import ItemEditView
 from views.category_view import CategoryView
 from views.user_view import UserView
 from views.new_item_view import NewItemView
+from lib.api import ApiClient
+from lib.photos import PhotoLoader
+from lib.photo_cache import PhotoCache
+from lib.http_cache import ResponseCache
+from lib.sync import ItemSync
+from lib.report import ReportBuilder
+from lib.upload import ItemUploader
+from lib.image_policy import ImagePolicy
+from lib.thumbnails import Thumbnails
 import os
 import sys
 import json
@@ -18,6 +27,27 @@ def main(page: ft.Page):
 		page.ROOT_URL = config["ROOT_URL"] # root url for requests to API
 		page.TIMER_RATE = config["TIMER_RATE"]
 		page.THEME = config["THEME"]
+		page.REQUEST_TIMEOUT = config.get("REQUEST_TIMEOUT", 30)
+		page.POOL_SIZE = config.get("POOL_SIZE", 10)
+		page.PHOTO_WORKERS = config.get("PHOTO_WORKERS", 4)
+		page.PHOTO_CACHE_SIZE_MB = config.get("PHOTO_CACHE_SIZE_MB", 512)
+		# thumbnails of photos in items table
+		page.THUMBNAIL_SIZE = config.get("THUMBNAIL_SIZE", 96)
+		page.THUMBNAIL_MEMORY_ITEMS = config.get("THUMBNAIL_MEMORY_ITEMS", 512)
+		# build reports on client instead of server
+		page.LOCAL_REPORT = config.get("LOCAL_REPORT", False)
+		page.REPORT_FONT = config.get("REPORT_FONT", "")
+		# send filter or compressed id ranges instead of plain id list to /report,
+		# enable only with server that supports them: older server may build report from ignored body
+		page.COMPACT_REPORT_REQUEST = config.get("COMPACT_REPORT_REQUEST", False)
+		# send photos of items in multipart form instead of base64 in JSON
+		page.MULTIPART_UPLOAD = config.get("MULTIPART_UPLOAD", True)
+		# downscale and recompression of photos before upload
+		page.UPLOAD_MAX_SIDE = config.get("UPLOAD_MAX_SIDE", 2000)
+		page.UPLOAD_FORMAT = config.get("UPLOAD_FORMAT", "jpeg")
+		page.UPLOAD_QUALITY = config.get("UPLOAD_QUALITY", 85)
+		page.UPLOAD_STRIP_EXIF = config.get("UPLOAD_STRIP_EXIF", True)
+		page.UPLOAD_GRAYSCALE = config.get("UPLOAD_GRAYSCALE", False)
 		print(f"<*> Startup params: theme={page.THEME}, timer rate={page.TIMER_RATE}, root url={page.ROOT_URL}")
 		
 		page.STORAGE_PATH = config["STORAGE_PATH"]
@@ -31,6 +61,8 @@ def main(page: ft.Page):
 
 		print(f"> Created TEMP storage: {page.TEMP_STORAGE_PATH}")
 
+		page.CACHE_STORAGE_PATH = os.path.join(page.STORAGE_PATH, 'cache')
+
 
 	# setting app theme
 	try:
@@ -51,11 +83,26 @@ def main(page: ft.Page):
 	# needed for correct views work according to account rights 
 	page.current_session_username = None 
 	page.current_session_admin = None
-	# needed for requests to api
-	page.token = None
-	page.request_headers = None
-	# for requests that send json data
-	page.content_provided_request_headers = None
+	# shared client for requests to api (keeps connection pool and auth headers)
+	page.api = ApiClient(page.ROOT_URL, timeout=(5, page.REQUEST_TIMEOUT), pool_size=page.POOL_SIZE)
+	# persistent photo cache and background loader for item photos
+	page.photo_cache = PhotoCache(page.CACHE_STORAGE_PATH, budget=page.PHOTO_CACHE_SIZE_MB*1024*1024)
+	page.photos = PhotoLoader(page.api, page.photo_cache, workers=page.PHOTO_WORKERS)
+	page.thumbnails = Thumbnails(
+		page.photos, os.path.join(page.CACHE_STORAGE_PATH, 'thumbs'),
+		size=page.THUMBNAIL_SIZE, memory_items=page.THUMBNAIL_MEMORY_ITEMS
+	)
+	# cache of api responses revalidated with conditional requests
+	page.http_cache = ResponseCache(page.api, os.path.join(page.CACHE_STORAGE_PATH, 'responses'))
+	# incremental sync of item list
+	page.sync = ItemSync(page.api, page.http_cache)
+	# local pdf reports
+	page.report = ReportBuilder(page.photos, workers=page.PHOTO_WORKERS, font_path=page.REPORT_FONT or None)
+	page.uploader = ItemUploader(page.api, multipart=page.MULTIPART_UPLOAD)
+	page.image_policy = ImagePolicy(
+		max_side=page.UPLOAD_MAX_SIDE, format=page.UPLOAD_FORMAT, quality=page.UPLOAD_QUALITY,
+		strip_exif=page.UPLOAD_STRIP_EXIF, grayscale=page.UPLOAD_GRAYSCALE
+	)
 	# stroring loaded objects
 	page.loaded_items = None
 	page.filtered_items = None 
@@ -65,6 +112,9 @@ def main(page: ft.Page):
 		if e.data == "close":
 			# Removing temp files
 			print("> Application is closing. Performing cleanup...")
+			page.thumbnails.shutdown()
+			page.photos.shutdown()
+			page.photo_cache.save()
 			count = 0
 			start_count = len(os.listdir(page.TEMP_STORAGE_PATH))
 			for item_name in os.listdir(page.TEMP_STORAGE_PATH):
@@ -73,6 +123,9 @@ def main(page: ft.Page):
 					os.remove(item_path)
 					count += 1
 			print(f": Removed {count} of {start_count} files")
+			stats = page.api.stats()
+			print(f": API requests: {stats['requests']}, connections opened: {stats['connections']}, reused: {stats['reused']}")
+			page.api.close()
 			
 			page.window.prevent_close = False
 			page.window.on_event = None  
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of the app are imported from src root, as main.py does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
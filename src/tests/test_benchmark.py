@@ -0,0 +1,11 @@
+import pytest
+
+pytest.importorskip("flet")
+
+from tools import benchmark
+
+
+def test_all_flows_run_on_small_dataset():
+	results = benchmark.run([200], repeat=1, latency=0, bandwidth=0)
+	assert [result["flow"] for result in results] == [name for name, _ in benchmark.FLOWS]
+	assert all(result["median"] > 0 for result in results)
@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from lib import models
+from lib.models import Item
+from lib.item_store import ItemStore
+
+
+# sums that are not exact in binary floating point: 1.1*100 != 110
+BOUNDARY_FILTERS = [
+	(1.1, float('inf'), {1, 3}),
+	(0, 1.1, {1, 2, 4}),
+	(1.1, 1.1, {1}),
+	(0.29, 0.29, {2}),
+	(0.29, 1.1, {1, 2}),
+	(0.3, 1.09, set()),
+]
+
+
+def make_items():
+	day = datetime.date(2024, 5, 1).toordinal()
+	return [
+		Item(1, 'Еда', day, 110),
+		Item(2, 'Еда', day + 1, 29),
+		Item(3, 'Хозтовары', day + 2, 1000),
+		Item(4, 'Хозтовары', day + 3, 0),
+	]
+
+
+def ids(items):
+	return set(item.id for item in items)
+
+
+def test_parse_cents_bound():
+	assert models.parse_cents_bound(1.1) == 110
+	assert models.parse_cents_bound(0.29) == 29
+	assert models.parse_cents_bound(5) == 500
+	assert models.parse_cents_bound(float('inf')) == float('inf')
+	assert models.parse_cents_bound(-float('inf')) == -float('inf')
+
+
+@pytest.mark.parametrize("minimum_sum, maximum_sum, expected", BOUNDARY_FILTERS)
+def test_scan_sum_bounds(minimum_sum, maximum_sum, expected):
+	pytest.importorskip("flet")
+	from lib import utils
+	assert ids(utils.get_filtered_items(make_items(), None, None, minimum_sum, maximum_sum, None)) == expected
+
+
+def test_scan_date_and_category():
+	pytest.importorskip("flet")
+	from lib import utils
+	result = utils.get_filtered_items(make_items(), '2024-05-02', '2024-05-03', 0, float('inf'), 'Еда')
+	assert ids(result) == {2}
+
+
+@pytest.mark.parametrize("minimum_sum, maximum_sum, expected", BOUNDARY_FILTERS)
+def test_store_sum_bounds(minimum_sum, maximum_sum, expected):
+	assert ids(ItemStore(make_items()).filter(None, None, minimum_sum, maximum_sum, None)) == expected
+
+
+def test_store_keeps_list_order_and_filters_category():
+	items = make_items()
+	store = ItemStore(items)
+	assert [item.id for item in store.filter()] == [1, 2, 3, 4]
+	assert ids(store.filter('2024-05-02', None, 0, float('inf'), 'Хозтовары')) == {3, 4}
+	assert store.filter(category='Нет такой') == []
@@ -0,0 +1,104 @@
+import bisect
+import random
+import datetime
+
+import pytest
+
+from lib.models import Item
+from lib.item_index import ItemIndex, SortedKeys
+from test_filters import BOUNDARY_FILTERS, make_items, ids
+
+
+def random_items(count, seed=0):
+	rng = random.Random(seed)
+	day = datetime.date(2023, 1, 1).toordinal()
+	return [
+		Item(i, rng.choice(['Еда', 'Хозтовары', 'Связь']), day + rng.randrange(400), rng.randrange(5000))
+		for i in range(1, count + 1)
+	]
+
+
+def scan(items, first, last, low, high, category):
+	return [
+		item.id for item in items
+		if first <= item.date <= last and low <= item.cents <= high
+		and (category is None or item.category == category)
+	]
+
+
+def test_sorted_keys_matches_sorted_list(monkeypatch):
+	monkeypatch.setattr(SortedKeys, 'BUCKET', 8)
+	rng = random.Random(1)
+	reference = sorted(rng.sample(range(10000), 300))
+	keys = SortedKeys(reference)
+	for _ in range(2000):
+		key = rng.randrange(10000)
+		if rng.random() < 0.5:
+			# keys are unique in index
+			if key not in reference:
+				bisect.insort(reference, key)
+				keys.add(key)
+		else:
+			if key in reference:
+				reference.remove(key)
+			keys.discard(key)
+		probe = rng.randrange(10000)
+		assert keys.bisect_left(probe) == bisect.bisect_left(reference, probe)
+		assert keys.bisect_right(probe) == bisect.bisect_right(reference, probe)
+	assert list(keys) == reference
+	assert len(keys) == len(reference)
+	for start, stop in [(0, 5), (3, 40), (100, len(reference)), (len(reference) - 2, len(reference) + 5)]:
+		assert keys.slice(start, stop) == reference[start:stop]
+
+
+@pytest.mark.parametrize("fraction", [1.0, 0.0])
+@pytest.mark.parametrize("minimum_sum, maximum_sum, expected", BOUNDARY_FILTERS)
+def test_index_and_store_paths_agree_on_bounds(monkeypatch, fraction, minimum_sum, maximum_sum, expected):
+	# fraction 1.0 - always answered from index, 0.0 - always from store
+	monkeypatch.setattr(ItemIndex, 'INDEX_FRACTION', fraction)
+	index = ItemIndex(make_items())
+	assert ids(index.filter(None, None, minimum_sum, maximum_sum, None)) == expected
+
+
+def test_filter_after_changes_matches_scan():
+	items = random_items(3000)
+	index = ItemIndex(items)
+	index.build()
+	rng = random.Random(2)
+	current = {item.id: item for item in items}
+	summary = index.summary('2023-03-01', '2023-09-30', 10, 30.5, None)
+	for n in range(500):
+		if rng.random() < 0.3 and current:
+			id_ = rng.choice(list(current))
+			del current[id_]
+			index.remove(id_)
+		else:
+			id_ = rng.randrange(1, 4000)
+			item = random_items(1, seed=n)[0]
+			item.id = id_
+			current[id_] = item
+			index.update(item)
+	spec = index.spec('2023-03-01', '2023-09-30', 10, 30.5, None)
+	for params in [('2023-03-01', '2023-09-30', 10, 30.5, None), (None, None, 1.1, 1.1, None), (None, None, 0, float('inf'), 'Еда')]:
+		expected = set(scan(current.values(), *index.spec(*params)))
+		assert ids(index.filter(*params)) == expected
+	matching = [item for item in current.values() if summary.matches(item)]
+	assert summary.count == len(matching) == len(scan(current.values(), *spec))
+	assert summary.cents == sum(item.cents for item in matching)
+
+
+def test_result_keeps_list_order():
+	items = random_items(500)
+	index = ItemIndex(items)
+	result = index.filter(None, None, 0, 10, None)
+	positions = [items.index(item) for item in result]
+	assert positions == sorted(positions)
+
+
+def test_clear_cache_queries_again():
+	index = ItemIndex(random_items(500))
+	first = index.filter(None, None, 0, 10, None)
+	assert index.filter(None, None, 0, 10, None) is first
+	index.clear_cache()
+	second = index.filter(None, None, 0, 10, None)
+	assert second is not first and second == first
@@ -0,0 +1,52 @@
+import os
+import time
+
+from lib.photo_cache import PhotoCache
+
+
+def write(path, content):
+	with open(path, 'wb') as f:
+		f.write(content)
+	return path
+
+
+def test_put_file_survives_crash(tmp_path, monkeypatch):
+	monkeypatch.setattr(PhotoCache, 'SAVE_DELAY', 0.05)
+	cache = PhotoCache(str(tmp_path))
+	path = cache.put_file(1, write(str(tmp_path / 'a.tmp'), b'photo'), 'a.jpg', {"etag": '"1"'})
+	time.sleep(0.3)
+	# no save() call, as after kill of the app
+	reopened = PhotoCache(str(tmp_path))
+	assert reopened.get(1) == path
+	assert reopened.get_validators(1) == {"etag": '"1"'}
+	assert os.path.isfile(path)
+
+
+def test_same_content_is_stored_once(tmp_path):
+	cache = PhotoCache(str(tmp_path))
+	first = cache.put(1, b'same', 'a.png')
+	second = cache.put(2, b'same', 'b.png')
+	assert first == second
+	cache.discard(1)
+	assert os.path.isfile(second)
+	cache.discard(2)
+	assert not os.path.isfile(second)
+
+
+def test_put_copy_keeps_source(tmp_path):
+	cache = PhotoCache(str(tmp_path / 'cache'))
+	source = write(str(tmp_path / 'upload_photo.jpg'), b'sent photo')
+	path = cache.put_copy(7, source)
+	assert os.path.isfile(source)
+	assert path.endswith('.jpg')
+	with open(path, 'rb') as f:
+		assert f.read() == b'sent photo'
+
+
+def test_evicts_least_recently_used(tmp_path):
+	cache = PhotoCache(str(tmp_path), budget=10)
+	cache.put(1, b'123456', 'a.png')
+	cache.put(2, b'abcdef', 'b.png')
+	assert cache.get(1) is None
+	assert cache.get(2) is not None
+	assert cache.size <= 10
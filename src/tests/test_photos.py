@@ -0,0 +1,53 @@
+import os
+import json
+import threading
+
+import pytest
+
+from lib.api import ApiClient
+from lib.download import download
+from lib.models import Item
+from lib.photo_cache import PhotoCache
+from lib.photos import PhotoLoader
+from tools.stand_in_server import StandInServer, Dataset
+
+
+@pytest.fixture
+def api():
+	server = StandInServer(Dataset(20)).start()
+	client = ApiClient(server.url)
+	client.set_token(client.get('/login', json={"username": "admin", "password": "admin"}).json()["access_token"])
+	yield client
+	client.close()
+	server.stop()
+
+
+def test_loads_release_item_locks(api, tmp_path):
+	loader = PhotoLoader(api, PhotoCache(str(tmp_path)))
+	items = [Item.from_json(record) for record in api.get('/item/all').json()]
+	threads = [threading.Thread(target=loader.load, args=(item,)) for item in items[:5] for _ in range(3)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert all(loader.is_valid(item) for item in items[:5])
+	assert loader._loading == {}
+	loader.shutdown()
+
+
+def test_download_resumes_partial_file(api, tmp_path):
+	path = str(tmp_path / 'photo.png')
+	full = api.get('/files/1').content
+	resp = download(api, '/files/1', path)
+	assert resp.status_code == 200
+	# interrupted download: first half and validators of the same response are left
+	os.remove(path)
+	with open(path + '.part', 'wb') as f:
+		f.write(full[:len(full)//2])
+	with open(path + '.part.json', 'w') as f:
+		json.dump(api.validators(resp), f)
+	resp = download(api, '/files/1', path)
+	assert resp.status_code == 206
+	with open(path, 'rb') as f:
+		assert f.read() == full
+	assert not os.path.exists(path + '.part') and not os.path.exists(path + '.part.json')
@@ -0,0 +1,62 @@
+import gzip
+import json
+import random
+
+import pytest
+
+from lib.models import Item
+from lib.report_query import encode_id_ranges, decode_id_ranges, filter_spec, report_request, legacy_report_request
+
+
+@pytest.mark.parametrize("ids, encoded", [
+	([], []),
+	([5], [5, 1]),
+	([1, 2, 3, 7, 8, 10], [1, 3, 3, 2, 1, 1]),
+	([3, 1, 2, 2], [1, 3]),
+])
+def test_encode_id_ranges(ids, encoded):
+	assert encode_id_ranges(ids) == encoded
+	assert decode_id_ranges(encoded) == sorted(set(ids))
+
+
+def test_id_ranges_round_trip():
+	rng = random.Random(0)
+	for _ in range(50):
+		ids = rng.sample(range(1, 5000), rng.randrange(0, 600))
+		assert decode_id_ranges(encode_id_ranges(ids)) == sorted(ids)
+
+
+def test_filter_spec_drops_infinite_bounds():
+	assert filter_spec('2024-01-01', None, 1.1, float('inf'), 'Еда') == {
+		"start": '2024-01-01', "end": None, "min_sum": 1.1, "max_sum": None, "category": 'Еда'
+	}
+
+
+def body(request):
+	assert request["headers"]["Content-Encoding"] == 'gzip'
+	return json.loads(gzip.decompress(request["data"]))
+
+
+def test_report_request_bodies():
+	items = [Item(id_, 'Еда', 1, 100) for id_ in [1, 2, 3, 10]]
+	assert body(report_request(None, items)) == {"id_ranges": [1, 3, 6, 1]}
+	assert body(report_request((), items)) == {"filter": {}}
+	assert body(report_request((None, None, 0, float('inf'), 'Еда'), items))["filter"]["category"] == 'Еда'
+	assert legacy_report_request(items) == {"json": {"id_list": [1, 2, 3, 10]}}
+
+
+def test_stand_in_server_reads_compact_requests():
+	from lib.api import ApiClient
+	from tools.stand_in_server import StandInServer, Dataset
+	server = StandInServer(Dataset(50)).start()
+	api = ApiClient(server.url)
+	try:
+		api.set_token(api.get('/login', json={"username": "admin", "password": "admin"}).json()["access_token"])
+		items = [Item.from_json(record) for record in api.get('/item/all').json()][::3]
+		legacy = api.get('/report', **legacy_report_request(items))
+		compact = api.get('/report', **report_request(None, items))
+		assert legacy.status_code == compact.status_code == 200
+		assert legacy.content == compact.content
+	finally:
+		api.close()
+		server.stop()
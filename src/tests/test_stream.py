@@ -0,0 +1,65 @@
+import time
+import base64
+
+import pytest
+
+cv = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from lib.stream import Stream
+
+
+""" Camera stub giving frames of given shape """
+class FakeCapture():
+	def __init__(self, shape):
+		self.shape = shape
+		self.released = False
+
+	def read(self):
+		time.sleep(0.001)
+		return True, np.full(self.shape, 128, dtype=np.uint8)
+
+	def release(self):
+		self.released = True
+
+
+def open_stream(tmp_path, shape=(480, 640, 3)):
+	stream = Stream(str(tmp_path / 'missing.avi'))
+	stream.cap = FakeCapture(shape)
+	stream.available = True
+	return stream
+
+
+def wait_frame(stream):
+	for _ in range(500):
+		frame = stream.get_frame_raw()
+		if frame is not False:
+			return frame
+		time.sleep(0.002)
+	raise AssertionError("no frame captured")
+
+
+def test_release_stops_capture_for_good(tmp_path):
+	stream = open_stream(tmp_path)
+	wait_frame(stream)
+	thread = stream._thread
+	stream.release()
+	assert not thread.is_alive()
+	assert stream.cap.released
+	assert stream.get_frame_raw() is False
+	assert stream._thread is None and not stream._running
+
+
+@pytest.mark.parametrize("shape", [(480, 640, 3), (480, 640), (300, 400, 1), (200, 300, 3)])
+def test_preview_of_frame_shapes(tmp_path, shape):
+	stream = open_stream(tmp_path, shape)
+	wait_frame(stream)
+	preview = None
+	for _ in range(500):
+		preview = stream.get_preview(only_new=True, size=320)
+		if preview is not None:
+			break
+		time.sleep(0.002)
+	stream.release()
+	frame = cv.imdecode(np.frombuffer(base64.b64decode(preview), dtype=np.uint8), cv.IMREAD_UNCHANGED)
+	assert max(frame.shape[:2]) == min(320, max(shape[:2]))
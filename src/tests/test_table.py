@@ -0,0 +1,49 @@
+import types
+
+import pytest
+
+ft = pytest.importorskip("flet")
+
+from lib.table import VirtualTable
+
+
+class Record():
+	def __init__(self, id):
+		self.id = id
+
+
+def make_table(count, on_window=None):
+	table = VirtualTable(
+		[("id", 100)],
+		key=lambda record: record.id,
+		create_cells=lambda: [ft.Text()],
+		fill_cells=lambda cells, record: setattr(cells[0], 'value', str(record.id)),
+		row_height=40,
+		height=400,
+		buffer=10,
+		on_window=on_window
+	)
+	table.set_records([Record(i) for i in range(count)])
+	return table
+
+
+def shown_ids(table):
+	return [int(row.content.controls[0].content.value) for row in table.body.controls[1:-1]]
+
+
+def test_scroll_handler_is_wired():
+	table = make_table(10)
+	assert table.body.on_scroll == table.handle_scroll
+
+
+def test_scroll_moves_rendered_window():
+	windows = []
+	table = make_table(1000, on_window=lambda first, count: windows.append((first, count)))
+	assert table.start == 0
+	assert shown_ids(table)[0] == 0
+	table.body.on_scroll(types.SimpleNamespace(pixels=40*500, viewport_dimension=400))
+	assert table.first == 500
+	assert table.start == 500 - table.buffer
+	assert shown_ids(table)[0] == table.start
+	assert table.top_spacer.height == table.start*40
+	assert windows[-1] == (500, table.visible_count)
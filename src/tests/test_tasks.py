@@ -0,0 +1,49 @@
+import threading
+
+from lib.tasks import background
+
+
+class Page():
+	def __init__(self):
+		self.threads = []
+
+	def run_thread(self, target):
+		thread = threading.Thread(target=target)
+		self.threads.append(thread)
+		thread.start()
+
+
+class View():
+	def __init__(self):
+		self.page = Page()
+		self.release = threading.Event()
+		self.deleted = []
+
+	@background
+	def delete_item(self, e=None, id=None):
+		self.release.wait(5)
+		self.deleted.append(id)
+
+
+def test_calls_for_other_items_are_not_dropped():
+	view = View()
+	view.delete_item(None, id=1)
+	view.delete_item(None, id=2)
+	view.release.set()
+	for thread in view.page.threads:
+		thread.join()
+	assert sorted(view.deleted) == [1, 2]
+
+
+def test_repeated_call_is_ignored_while_in_flight():
+	view = View()
+	view.delete_item(None, id=1)
+	view.delete_item(None, id=1)
+	view.release.set()
+	for thread in view.page.threads:
+		thread.join()
+	assert view.deleted == [1]
+	# finished call doesn't block next one
+	view.delete_item(None, id=1)
+	view.page.threads[-1].join()
+	assert view.deleted == [1, 1]
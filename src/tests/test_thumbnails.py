@@ -0,0 +1,24 @@
+import os
+import types
+
+import pytest
+
+cv = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from lib.photo_cache import PhotoCache
+from lib.thumbnails import Thumbnails
+
+
+def test_prepare_makes_thumbnail_of_cached_photo(tmp_path):
+	cache = PhotoCache(str(tmp_path / 'cache'))
+	photo = str(tmp_path / 'photo.jpg')
+	cv.imwrite(photo, np.full((600, 800, 3), 200, dtype=np.uint8))
+	cache.put_copy(3, photo)
+	thumbnails = Thumbnails(types.SimpleNamespace(cache=cache), str(tmp_path / 'thumbs'), size=64)
+	thumbnails.prepare(3)
+	thumbnails.executor.shutdown(wait=True)
+	path = thumbnails.path(cache.content_hash(3))
+	assert os.path.isfile(path)
+	frame = cv.imread(path)
+	assert max(frame.shape[:2]) == 64
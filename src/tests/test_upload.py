@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("flet")
+
+from lib.upload import MultipartBody, ItemUploader
+
+
+class Response():
+	def __init__(self, status_code):
+		self.status_code = status_code
+
+
+""" Api stub replying with given statuses in order, records sent requests """
+class FakeApi():
+	def __init__(self, *statuses):
+		self.statuses = list(statuses)
+		self.requests = []
+
+	def post(self, path, **kwargs):
+		self.requests.append(kwargs)
+		return Response(self.statuses.pop(0))
+
+
+@pytest.fixture
+def photo(tmp_path):
+	path = tmp_path / 'photo.jpg'
+	path.write_bytes(b'\xff\xd8' + bytes(range(256)) * 300)
+	return str(path)
+
+
+def test_multipart_body_length(photo):
+	body = MultipartBody({"category": "Еда", "sum": 1.1}, 'image', photo, chunk_size=1000)
+	data = b''.join(body)
+	assert len(data) == len(body)
+	assert data.startswith(f'--{body.boundary}\r\n'.encode('utf-8'))
+	assert data.endswith(f'\r\n--{body.boundary}--\r\n'.encode('utf-8'))
+	with open(photo, 'rb') as f:
+		assert f.read() in data
+
+
+def test_fields_only_without_photo():
+	api = FakeApi(200)
+	ItemUploader(api).send('/update-item', {"id": 1})
+	assert api.requests == [{"json": {"id": 1}}]
+
+
+def test_rejected_multipart_falls_back_for_session(photo):
+	api = FakeApi(415, 200, 200)
+	uploader = ItemUploader(api)
+	assert uploader.send('/add-item', {"id": 1}, photo).status_code == 200
+	assert not uploader.multipart
+	uploader.send('/add-item', {"id": 2}, photo)
+	assert "image" in api.requests[1]["json"] and "image" in api.requests[2]["json"]
+
+
+def test_server_error_is_not_repeated(photo):
+	api = FakeApi(500)
+	uploader = ItemUploader(api)
+	assert uploader.send('/add-item', {"id": 1}, photo).status_code == 500
+	assert len(api.requests) == 1
+	assert uploader.multipart
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import shutil
+import base64
+import platform
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import flet as ft
+from lib.api import ApiClient
+from lib.http_cache import ResponseCache
+from lib.sync import ItemSync
+from lib.download import download
+from lib.report_query import report_request
+from lib.table import VirtualTable
+from tools.stand_in_server import StandInServer, Dataset, make_png
+
+
+"""
+End-to-end load benchmark of client against local stand-in server
+times main user flows on datasets of different size, runs headless
+and writes results as json.
+Usage: python tools/benchmark.py --sizes 1000 10000 100000 --output bench_results.json
+"""
+
+
+def login(url):
+	api = ApiClient(url)
+	resp = api.get('/login', json={'username': 'admin', 'password': 'admin'})
+	api.set_token(resp.json()['access_token'])
+	return api
+
+
+""" Build items table the same way ItemsView does, without page """
+def render_table(items):
+	def create_cells():
+		return [ft.Text(), ft.Text(), ft.Text()]
+
+	def fill_cells(cells, item):
+		cells[0].value = item.date_text
+		cells[1].value = item.category
+		cells[2].value = item.sum_text
+
+	table = VirtualTable(
+		columns=[("Дата", 110), ("Категория", 200), ("Сумма", 120)],
+		key=lambda item: item.id,
+		create_cells=create_cells,
+		fill_cells=fill_cells
+	)
+	table.set_records(items)
+	return table
+
+
+class Context():
+	def __init__(self, url, workdir):
+		self.url = url
+		self.workdir = workdir
+		self.api = None
+		self.sync = None
+		self.items = None
+
+
+""" Login, load item list and render table with cold cache """
+def flow_login_to_table(ctx):
+	cache_path = tempfile.mkdtemp(dir=ctx.workdir)
+	ctx.api = login(ctx.url)
+	ctx.sync = ItemSync(ctx.api, ResponseCache(ctx.api, cache_path))
+	ctx.items = ctx.sync.refresh()
+	render_table(ctx.items)
+
+
+""" Refresh of already loaded list (reload button) """
+def flow_refresh(ctx):
+	ctx.items = ctx.sync.refresh()
+	render_table(ctx.items)
+
+
+""" Apply date, sum and category filter to loaded items """
+def flow_filter(ctx):
+	category = ctx.items[0].category
+	# every run queries indexes, not result cache of previous run
+	ctx.sync.index.clear_cache()
+	filtered = ctx.sync.index.filter('2021-01-01', '2023-12-31', 1000, 50000, category)
+	render_table(filtered)
+
+
+""" Edit one item with new photo and sync changes """
+def flow_edit(ctx):
+	item = ctx.items[len(ctx.items) // 2]
+	resp = ctx.api.post('/update-item', json={
+		"id": item.id,
+		"category": item.category,
+		"sum": item.cents // 100 + 1,
+		"creation_date": '2022-02-02',
+		"image": base64.b64encode(make_png(time.time_ns())).decode('utf-8')
+	})
+	resp.raise_for_status()
+	ctx.items = ctx.sync.refresh()
+	render_table(ctx.items)
+
+
+""" Get report about all loaded items """
+def flow_report(ctx):
+	resp = download(ctx.api, '/report', os.path.join(ctx.workdir, 'report.pdf'), **report_request((), ctx.items))
+	resp.raise_for_status()
+
+
+FLOWS = [
+	("login_to_table", flow_login_to_table),
+	("refresh", flow_refresh),
+	("filter", flow_filter),
+	("edit", flow_edit),
+	("report", flow_report),
+]
+
+
+def run(sizes, repeat, latency, bandwidth):
+	results = []
+	for size in sizes:
+		print(f"> Dataset: {size} items")
+		server = StandInServer(Dataset(size), latency=latency, bandwidth=bandwidth).start()
+		workdir = tempfile.mkdtemp(prefix='photis-bench-')
+		ctx = Context(server.url, workdir)
+		try:
+			for name, flow in FLOWS:
+				runs = []
+				for _ in range(repeat):
+					start = time.perf_counter()
+					flow(ctx)
+					runs.append(time.perf_counter() - start)
+				results.append({
+					"items": size,
+					"flow": name,
+					"runs": runs,
+					"median": statistics.median(runs),
+					"min": min(runs)
+				})
+				print(f": {name:<16} median {statistics.median(runs)*1000:10.1f} ms")
+			stats = ctx.api.stats()
+			print(f": API requests: {stats['requests']}, connections opened: {stats['connections']}")
+		finally:
+			server.stop()
+			shutil.rmtree(workdir, ignore_errors=True)
+	return results
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Photis client load benchmark")
+	parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="dataset sizes")
+	parser.add_argument('--repeat', type=int, default=3, help="runs of each flow")
+	parser.add_argument('--latency', type=float, default=0, help="server reply delay, ms")
+	parser.add_argument('--bandwidth', type=float, default=0, help="server bandwidth limit, KB/s (0 - unlimited)")
+	parser.add_argument('--output', default='bench_results.json', help="path of json results file")
+	args = parser.parse_args()
+
+	results = run(args.sizes, args.repeat, args.latency / 1000, args.bandwidth*1024)
+	with open(args.output, 'w') as f:
+		json.dump({
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"latency_ms": args.latency,
+			"bandwidth_kbps": args.bandwidth,
+			"repeat": args.repeat,
+			"results": results
+		}, f, indent=2)
+	print(f"> Results saved: {args.output}")
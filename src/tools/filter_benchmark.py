@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lib import utils
+from lib.models import Item
+from lib.item_store import ItemStore
+from lib.item_index import ItemIndex
+from tools.stand_in_server import Dataset, CATEGORIES
+
+
+"""
+Benchmark of item filtering: list scan (utils.get_filtered_items)
+against columnar store (lib.item_store.ItemStore) and sorted indexes
+(lib.item_index.ItemIndex) on generated datasets.
+Index is timed without its result cache, cache hits are shown separately.
+Usage: python tools/filter_benchmark.py --sizes 10000 100000 1000000
+"""
+
+FILTERS = [
+	("date", ('2021-01-01', '2021-12-31', 0, float('inf'), None)),
+	("date_sum_category", ('2021-01-01', '2023-12-31', 1000, 50000, CATEGORIES[0])),
+	("sum", (None, None, 500, 600, None)),
+	("category", (None, None, 0, float('inf'), CATEGORIES[1])),
+	("week", ('2022-03-01', '2022-03-07', 0, float('inf'), None)),
+	("narrow_sum", (None, None, 1000, 1010, None)),
+]
+
+
+"""
+Median time of func.
+setup - called before every run and not timed
+"""
+def measure(func, repeat, setup=None):
+	runs = []
+	for _ in range(repeat):
+		if setup is not None:
+			setup()
+		start = time.perf_counter()
+		result = func()
+		runs.append(time.perf_counter() - start)
+	return statistics.median(runs), result
+
+
+def run(sizes, repeat):
+	results = []
+	for size in sizes:
+		print(f"> Dataset: {size} items")
+		items = [Item.from_json(record) for record in Dataset(size).items.values()]
+		build, store = measure(lambda: ItemStore(items), 1)
+		index = ItemIndex(items)
+		index_build, _ = measure(index.build, 1)
+		print(f": store build      {build*1000:10.1f} ms, index build {index_build*1000:10.1f} ms")
+		for name, params in FILTERS:
+			scan, expected = measure(lambda: utils.get_filtered_items(items, *params), repeat)
+			vector, result = measure(lambda: store.filter(*params), repeat)
+			# result cache of index is cleared before every run, cache hits are timed separately
+			indexed, index_result = measure(lambda: index.filter(*params), repeat, setup=index.clear_cache)
+			cached, _ = measure(lambda: index.filter(*params), repeat)
+			assert [item.id for item in result] == [item.id for item in expected]
+			assert [item.id for item in index_result] == [item.id for item in expected]
+			results.append({
+				"items": size,
+				"filter": name,
+				"matched": len(result),
+				"scan": scan,
+				"store": vector,
+				"store_build": build,
+				"index": indexed,
+				"index_cached": cached,
+				"index_build": index_build
+			})
+			print(f": {name:<18} scan {scan*1000:9.1f} ms, store {vector*1000:9.1f} ms, index {indexed*1000:9.1f} ms, cached {cached*1000:7.3f} ms")
+	return results
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Photis client filter benchmark")
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="dataset sizes")
+	parser.add_argument('--repeat', type=int, default=5, help="runs of each filter")
+	parser.add_argument('--output', default=None, help="path of json results file")
+	args = parser.parse_args()
+
+	results = run(args.sizes, args.repeat)
+	if args.output is not None:
+		with open(args.output, 'w') as f:
+			json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+		print(f"> Results saved: {args.output}")
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lib.image_policy import ImagePolicy, FORMATS
+
+
+"""
+Benchmark of upload image policy (lib.image_policy.ImagePolicy):
+bytes saved and time spent per photo.
+Photos are taken from given files / directories, without them
+phone-sized photos of generated receipts are used.
+Usage: python tools/image_benchmark.py photos/ --max-side 2000 --format jpeg --quality 85
+"""
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+""" Write photo of generated receipt with camera noise """
+def make_receipt(path, seed, size=(3000, 4000)):
+	rng = random.Random(seed)
+	width, height = size
+	frame = np.full((height, width, 3), 235, dtype=np.uint8)
+	for i in range(60):
+		text = f"{rng.choice(['Milk', 'Bread', 'Tea', 'Paper', 'Soap'])} x{rng.randint(1, 9)}   {rng.randint(10, 9999)}.{rng.randint(0, 99):02d}"
+		cv.putText(frame, text, (200, 200 + i*60), cv.FONT_HERSHEY_SIMPLEX, 1.6, (40, 40, 40), 3)
+	noise = np.random.default_rng(seed).normal(0, 6, frame.shape)
+	frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+	cv.imwrite(path, frame, [cv.IMWRITE_JPEG_QUALITY, 95])
+	return path
+
+
+def find_photos(paths):
+	photos = []
+	for path in paths:
+		if os.path.isdir(path):
+			for name in sorted(os.listdir(path)):
+				if name.lower().endswith(EXTENSIONS):
+					photos.append(os.path.join(path, name))
+		else:
+			photos.append(path)
+	return photos
+
+
+def run(photos, policy, workdir):
+	results = []
+	for path in photos:
+		start = time.perf_counter()
+		upload_path = policy.apply(path, workdir)
+		elapsed = time.perf_counter() - start
+		original = os.path.getsize(path)
+		uploaded = os.path.getsize(upload_path)
+		if upload_path != path:
+			os.remove(upload_path)
+		results.append({
+			"photo": os.path.basename(path),
+			"original": original,
+			"uploaded": uploaded,
+			"saved": original - uploaded,
+			"time": elapsed
+		})
+		print(f": {os.path.basename(path):<24} {original/1024:9.0f} KB -> {uploaded/1024:7.0f} KB ({(original - uploaded)*100/original:5.1f}% saved), {elapsed*1000:7.1f} ms")
+	if results:
+		total = sum(result["original"] for result in results)
+		saved = sum(result["saved"] for result in results)
+		print(f"> Total: {saved/1024:.0f} KB of {total/1024:.0f} KB saved ({saved*100/total:.1f}%), "
+			f"{sum(result['time'] for result in results)*1000/len(results):.1f} ms per photo")
+	return results
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Photis client upload image policy benchmark")
+	parser.add_argument('paths', nargs='*', help="photos or directories with photos, generated receipts if empty")
+	parser.add_argument('--count', type=int, default=5, help="number of generated photos")
+	parser.add_argument('--max-side', type=int, default=2000, help="max length of long edge, 0 - keep resolution")
+	parser.add_argument('--format', choices=list(FORMATS), default='jpeg')
+	parser.add_argument('--quality', type=int, default=85)
+	parser.add_argument('--keep-exif', action='store_true', help="send original file if policy doesn't make it smaller")
+	parser.add_argument('--grayscale', action='store_true')
+	parser.add_argument('--output', default=None, help="path of json results file")
+	args = parser.parse_args()
+
+	policy = ImagePolicy(args.max_side, args.format, args.quality, not args.keep_exif, args.grayscale)
+	with tempfile.TemporaryDirectory() as workdir:
+		photos = find_photos(args.paths)
+		if not photos:
+			print(f"> Generating {args.count} receipt photos")
+			photos = [make_receipt(os.path.join(workdir, f"receipt_{i}.jpg"), i) for i in range(args.count)]
+		results = run(photos, policy, workdir)
+	if args.output is not None:
+		with open(args.output, 'w') as f:
+			json.dump({"policy": vars(policy), "results": results}, f, indent=2)
+		print(f"> Results saved: {args.output}")
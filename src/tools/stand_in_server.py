@@ -0,0 +1,537 @@
+import os
+import re
+import sys
+import json
+import time
+import gzip
+import zlib
+import base64
+import struct
+import random
+import hashlib
+import argparse
+import datetime
+import threading
+import urllib.parse
+from email.utils import formatdate
+from email.parser import BytesParser
+from email import policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lib.report_query import decode_id_ranges
+
+
+"""
+Local stand-in for Photis API server
+serves generated dataset through all endpoints used by client,
+supports conditional requests (ETag / If-Modified-Since), range requests of files,
+changes feed for incremental sync (/item/changes?since=cursor)
+and simulates network latency and bandwidth.
+Usage: python tools/stand_in_server.py --items 1000 --port 8000 --latency 50 --bandwidth 2048
+"""
+
+CATEGORIES = ["Продукты", "Транспорт", "Канцелярия", "Хозтовары", "Связь"]
+
+
+""" Build small solid color PNG image """
+def make_png(seed, size=64):
+	rng = random.Random(seed)
+	color = bytes([rng.randrange(256), rng.randrange(256), rng.randrange(256)])
+	raw = b''.join(b'\x00' + color*size for _ in range(size))
+
+	def chunk(tag, data):
+		return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+	header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+	return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+""" Build minimal one page PDF document listing report items """
+def make_pdf(items):
+	lines = [f"{item['id']} {item['creation_date']} {item['sum']}" for item in items[:60]]
+	text = " ".join(f"({line}) '" for line in lines)
+	stream = f"BT /F1 10 Tf 40 800 Td 12 TL (Report: {len(items)} items) Tj {text} ET".encode('latin-1')
+	objects = [
+		b"<< /Type /Catalog /Pages 2 0 R >>",
+		b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+		b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+		b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+		b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+	]
+	pdf = b"%PDF-1.4\n"
+	offsets = []
+	for i, obj in enumerate(objects):
+		offsets.append(len(pdf))
+		pdf += f"{i + 1} 0 obj\n".encode() + obj + b"\nendobj\n"
+	xref = len(pdf)
+	pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+	pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+	pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+	return pdf
+
+
+""" Format date as it is returned by API """
+def http_date(date):
+	return date.strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+
+""" Convert date from client (YYYY-MM-DD) to format returned by API """
+def parse_client_date(date):
+	return http_date(datetime.datetime.strptime(date, '%Y-%m-%d'))
+
+
+""" Check item against filter spec of report request """
+def matches_filter(item, spec):
+	date = datetime.datetime.strptime(item["creation_date"], '%a, %d %b %Y %H:%M:%S GMT').date()
+	if spec.get("start") and date < datetime.date.fromisoformat(spec["start"]):
+		return False
+	if spec.get("end") and date > datetime.date.fromisoformat(spec["end"]):
+		return False
+	if spec.get("min_sum") is not None and item["sum"] < spec["min_sum"]:
+		return False
+	if spec.get("max_sum") is not None and item["sum"] > spec["max_sum"]:
+		return False
+	return not spec.get("category") or item["category"] == spec["category"]
+
+
+""" Request body type which server is configured not to accept """
+class UnsupportedMedia(Exception):
+	pass
+
+
+
+"""
+Generated dataset of stand-in server
+items - number of items
+seed - random seed for reproducible data
+"""
+class Dataset():
+	def __init__(self, items=1000, seed=0):
+		rng = random.Random(seed)
+		start = datetime.datetime(2020, 1, 1)
+		self.lock = threading.Lock()
+		self.categories = [{"id": i + 1, "category": c} for i, c in enumerate(CATEGORIES)]
+		self.users = [{"username": "admin", "password": "admin", "admin": 1}]
+		self.items = {}
+		# item id -> uploaded photo, generated photos are built on request
+		self.files = {}
+		# version of dataset, changed on every modification, used as sync cursor
+		self.version = 1
+		# item id -> dataset version of last change
+		self.item_versions = {}
+		# deleted item id -> dataset version of deletion
+		self.deleted = {}
+		self.modified = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+		for id_ in range(1, items + 1):
+			date = start + datetime.timedelta(days=rng.randrange(5*365))
+			self.items[id_] = {
+				"id": id_,
+				"category": rng.choice(CATEGORIES),
+				"sum": rng.randrange(1, 100000),
+				"creation_date": http_date(date),
+				"file_name": f"{id_}.png"
+			}
+			self.item_versions[id_] = self.version
+
+	def touch(self):
+		self.version += 1
+		self.modified = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+	def get_file(self, id_):
+		if id_ not in self.items:
+			return None
+		if id_ not in self.files:
+			return make_png(id_)
+		return self.files[id_]
+
+	def add_item(self, item, content):
+		with self.lock:
+			self.touch()
+			id_ = max(list(self.items) + list(self.deleted) + [0]) + 1
+			self.items[id_] = dict(item, id=id_, file_name=f"{id_}.png")
+			self.files[id_] = content
+			self.item_versions[id_] = self.version
+			return self.items[id_]
+
+	def update_item(self, id_, fields, content=None):
+		with self.lock:
+			if id_ not in self.items:
+				return None
+			self.touch()
+			self.items[id_].update(fields)
+			if content is not None:
+				self.files[id_] = content
+			self.item_versions[id_] = self.version
+			return self.items[id_]
+
+	def delete_item(self, id_):
+		with self.lock:
+			if self.items.pop(id_, None) is None:
+				return False
+			self.touch()
+			self.files.pop(id_, None)
+			self.item_versions.pop(id_, None)
+			self.deleted[id_] = self.version
+			return True
+
+	""" Items changed and deleted after version since """
+	def changes(self, since):
+		with self.lock:
+			return {
+				"cursor": str(self.version),
+				"items": [self.items[i] for i, v in self.item_versions.items() if v > since],
+				"deleted": [i for i, v in self.deleted.items() if v > since]
+			}
+
+
+class Handler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+
+	@property
+	def data(self):
+		return self.server.dataset
+
+	@property
+	def route(self):
+		return urllib.parse.urlparse(self.path).path
+
+	@property
+	def query(self):
+		return urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+
+	def log_message(self, format, *args):
+		if self.server.verbose:
+			super().log_message(format, *args)
+
+	def read_body(self):
+		length = int(self.headers.get('Content-Length') or 0)
+		body = self.rfile.read(length) if length else b''
+		if body and self.headers.get('Content-Encoding') == 'gzip':
+			body = gzip.decompress(body)
+		return body
+
+	def read_json(self):
+		body = self.read_body()
+		return json.loads(body) if body else {}
+
+	""" Write body with simulated bandwidth limit """
+	def write_body(self, body):
+		bandwidth = self.server.bandwidth
+		if not bandwidth:
+			self.wfile.write(body)
+			return
+		chunk_size = 16*1024
+		for i in range(0, len(body), chunk_size):
+			chunk = body[i:i + chunk_size]
+			self.wfile.write(chunk)
+			time.sleep(len(chunk) / bandwidth)
+
+	def send(self, status, body=b'', content_type='application/json', headers=None):
+		if isinstance(body, (dict, list)):
+			body = json.dumps(body).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', content_type)
+		self.send_header('Content-Length', str(len(body)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		if self.command != 'HEAD':
+			self.write_body(body)
+
+	""" Get start of requested range (Range: bytes=N-) or None if whole body should be sent """
+	def range_start(self, etag, last_modified, size):
+		range_ = self.headers.get('Range')
+		if range_ is None:
+			return None
+		if_range = self.headers.get('If-Range')
+		if if_range is not None and if_range not in [etag, last_modified]:
+			return None
+		match = re.fullmatch(r'bytes=(\d+)-', range_.strip())
+		if match is None or int(match.group(1)) >= size:
+			return None
+		return int(match.group(1))
+
+	"""
+	Reply 304 if client validators match, otherwise send body with validators.
+	Range requests get 206 with the rest of body
+	"""
+	def send_conditional(self, etag, modified, body, content_type, headers=None):
+		last_modified = formatdate(modified.timestamp(), usegmt=True)
+		headers = dict(headers or {}, **{'ETag': etag, 'Last-Modified': last_modified, 'Accept-Ranges': 'bytes'})
+		if_none_match = self.headers.get('If-None-Match')
+		if_modified_since = self.headers.get('If-Modified-Since')
+		if (if_none_match is not None and if_none_match == etag) or \
+			(if_none_match is None and if_modified_since == last_modified):
+			self.server.count("not_modified")
+			self.send(304, headers=headers)
+			return
+		start = self.range_start(etag, last_modified, len(body))
+		if start is not None:
+			self.server.count("partial")
+			headers['Content-Range'] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+			self.send(206, body[start:], content_type, headers)
+			return
+		self.send(200, body, content_type, headers)
+
+	def authorized(self):
+		if self.headers.get('Authorization') != f'Bearer {self.server.token}':
+			self.read_body()
+			self.send(401, {"error": "unauthorized"})
+			return False
+		return True
+
+	""" Find handler of request by route and call it """
+	def dispatch(self, routes):
+		self.server.count("requests")
+		if self.server.latency:
+			time.sleep(self.server.latency)
+		for pattern, handler, auth in routes:
+			match = re.fullmatch(pattern, self.route)
+			if match is None:
+				continue
+			if auth and not self.authorized():
+				return
+			try:
+				handler(self, *match.groups())
+			except UnsupportedMedia as e:
+				self.send(415, {"error": f"unsupported content type: {e}"})
+			except (ValueError, KeyError, TypeError) as e:
+				self.send(400, {"error": str(e)})
+			return
+		self.read_body()
+		self.send(404, {"error": "not found"})
+
+	def do_GET(self):
+		self.dispatch(GET_ROUTES)
+
+	def do_POST(self):
+		self.dispatch(POST_ROUTES)
+
+	def do_DELETE(self):
+		self.dispatch(DELETE_ROUTES)
+
+	def login(self):
+		credentials = self.read_json()
+		for user in self.data.users:
+			if user["username"] == credentials.get('username') and user["password"] == credentials.get('password'):
+				self.send(200, {
+					"access_token": self.server.token,
+					"user_data": {"username": user["username"], "admin": user["admin"]}
+				})
+				return
+		self.send(401, {"error": "invalid credentials"})
+
+	def get_items(self):
+		self.read_body()
+		with self.data.lock:
+			body = json.dumps(list(self.data.items.values())).encode('utf-8')
+			version, modified = self.data.version, self.data.modified
+		self.send_conditional(f'"items-{version}"', modified, body, 'application/json', {'X-Sync-Cursor': str(version)})
+
+	def get_changes(self):
+		self.read_body()
+		try:
+			since = int(self.query.get('since', ['0'])[0])
+		except ValueError:
+			since = -1
+		if not 0 <= since <= self.data.version:
+			self.send(410, {"error": "unknown cursor"})
+			return
+		self.send(200, self.data.changes(since))
+
+	def get_file(self, id_):
+		self.read_body()
+		file = self.data.get_file(int(id_))
+		if file is None:
+			self.send(404, {"error": "not found"})
+			return
+		etag = '"' + hashlib.sha1(file).hexdigest() + '"'
+		self.send_conditional(etag, self.data.modified, file, 'image/png')
+
+	def get_categories(self):
+		self.read_body()
+		self.send(200, self.data.categories)
+
+	def get_users(self):
+		self.read_body()
+		self.send(200, [{"username": u["username"], "admin": u["admin"]} for u in self.data.users])
+
+	def get_report(self):
+		request = self.read_json()
+		with self.data.lock:
+			if "filter" in request:
+				items = [item for item in self.data.items.values() if matches_filter(item, request["filter"])]
+			else:
+				ids = decode_id_ranges(request["id_ranges"]) if "id_ranges" in request else request.get("id_list", [])
+				items = [self.data.items[i] for i in ids if i in self.data.items]
+		self.send(200, make_pdf(items), 'application/pdf')
+
+	""" Get item fields and photo content of multipart form or JSON request """
+	def read_item(self):
+		content_type = self.headers.get('Content-Type', '')
+		if not content_type.startswith('multipart/form-data'):
+			item = self.read_json()
+			image = item.pop("image", None)
+			return item, base64.b64decode(image.split(',')[-1]) if image else None
+		if not self.server.multipart:
+			self.read_body()
+			raise UnsupportedMedia(content_type)
+		form = BytesParser(policy=policy.HTTP).parsebytes(
+			f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + self.read_body()
+		)
+		item, content = {}, None
+		for part in form.iter_parts():
+			name = part.get_param('name', header='content-disposition')
+			if name == "image":
+				content = part.get_payload(decode=True)
+			else:
+				item[name] = part.get_payload(decode=True).decode('utf-8')
+		if "sum" in item:
+			item["sum"] = float(item["sum"])
+		return item, content
+
+	def add_item(self):
+		item, content = self.read_item()
+		if content is None:
+			raise ValueError("image is required")
+		item["creation_date"] = parse_client_date(item["creation_date"])
+		self.send(200, self.data.add_item(item, content))
+
+	def update_item(self):
+		item, content = self.read_item()
+		item["creation_date"] = parse_client_date(item["creation_date"])
+		updated = self.data.update_item(int(item.pop("id")), item, content)
+		if updated is None:
+			self.send(404, {"error": "not found"})
+			return
+		self.send(200, updated)
+
+	def delete_item(self, id_):
+		self.read_body()
+		if not self.data.delete_item(int(id_)):
+			self.send(404, {"error": "not found"})
+			return
+		self.send(200, {"deleted": int(id_)})
+
+	def add_category(self):
+		category = self.read_json()["category"]
+		with self.data.lock:
+			if any(c["category"] == category for c in self.data.categories):
+				self.send(409, {"error": "category exists"})
+				return
+			new_category = {"id": max([c["id"] for c in self.data.categories] + [0]) + 1, "category": category}
+			self.data.categories.append(new_category)
+		self.send(200, new_category)
+
+	def delete_category(self, id_):
+		self.read_body()
+		with self.data.lock:
+			self.data.categories = [c for c in self.data.categories if c["id"] != int(id_)]
+		self.send(200, {"deleted": int(id_)})
+
+	def add_user(self):
+		user = self.read_json()
+		with self.data.lock:
+			if any(u["username"] == user["username"] for u in self.data.users):
+				self.send(409, {"error": "user exists"})
+				return
+			self.data.users.append({"username": user["username"], "password": user["password"], "admin": int(user["admin"])})
+		self.send(200, {"username": user["username"]})
+
+	def delete_user(self, username):
+		self.read_body()
+		username = urllib.parse.unquote(username)
+		with self.data.lock:
+			self.data.users = [u for u in self.data.users if u["username"] != username]
+		self.send(200, {"deleted": username})
+
+
+# (route pattern, handler, needs authorization)
+GET_ROUTES = [
+	(r'/login', Handler.login, False),
+	(r'/item/all', Handler.get_items, True),
+	(r'/item/changes', Handler.get_changes, True),
+	(r'/files/(\d+)', Handler.get_file, True),
+	(r'/categories', Handler.get_categories, True),
+	(r'/users', Handler.get_users, True),
+	(r'/report', Handler.get_report, True),
+]
+POST_ROUTES = [
+	(r'/add-item', Handler.add_item, True),
+	(r'/update-item', Handler.update_item, True),
+	(r'/add-category', Handler.add_category, True),
+	(r'/add-user', Handler.add_user, True),
+]
+DELETE_ROUTES = [
+	(r'/delete-item/(\d+)', Handler.delete_item, True),
+	(r'/delete-category/(\d+)', Handler.delete_category, True),
+	(r'/delete-user/([^/]+)', Handler.delete_user, True),
+]
+
+
+"""
+Stand-in server running in background thread
+dataset - Dataset to serve
+latency - delay before each reply in seconds
+bandwidth - max speed of sending reply body in bytes per second (0 - unlimited)
+multipart - accept items in multipart form, otherwise only JSON with base64 photo is accepted
+"""
+class StandInServer():
+	def __init__(self, dataset=None, host='127.0.0.1', port=0, latency=0, bandwidth=0, verbose=False, multipart=True):
+		self.httpd = ThreadingHTTPServer((host, port), Handler)
+		self.httpd.daemon_threads = True
+		self.httpd.dataset = dataset or Dataset()
+		self.httpd.token = 'stand-in-token'
+		self.httpd.latency = latency
+		self.httpd.bandwidth = bandwidth
+		self.httpd.verbose = verbose
+		self.httpd.multipart = multipart
+		self.httpd.stats = {"requests": 0, "not_modified": 0, "partial": 0}
+		self.httpd.count = self.count
+		self._stats_lock = threading.Lock()
+		self.thread = None
+
+	def count(self, name):
+		with self._stats_lock:
+			self.httpd.stats[name] += 1
+
+	@property
+	def url(self):
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	@property
+	def stats(self):
+		return self.httpd.stats
+
+	def start(self):
+		self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Local stand-in for Photis API server")
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8000)
+	parser.add_argument('--items', type=int, default=1000, help="number of generated items")
+	parser.add_argument('--latency', type=float, default=0, help="delay before each reply, ms")
+	parser.add_argument('--bandwidth', type=float, default=0, help="reply bandwidth limit, KB/s (0 - unlimited)")
+	parser.add_argument('--no-multipart', action='store_true', help="reject items sent in multipart form")
+	args = parser.parse_args()
+
+	server = StandInServer(
+		Dataset(args.items), args.host, args.port, args.latency / 1000, args.bandwidth*1024,
+		verbose=True, multipart=not args.no_multipart
+	)
+	print(f"> Stand-in server: {server.url}, items={args.items}, login: admin/admin")
+	try:
+		server.httpd.serve_forever()
+	except KeyboardInterrupt:
+		server.stop()
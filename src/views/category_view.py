@@ -1,8 +1,8 @@
 from .base_view import BaseView
 import flet as ft
-import requests
-import json
 from lib import utils
+from lib.table import KeyedTable
+from lib.tasks import background
 
 
 class CategoryView(BaseView):
@@ -11,6 +11,7 @@ class CategoryView(BaseView):
 		
 		self.new_category_field = ft.TextField(label="Новая категория", width=300)
 		self.add_button = ft.ElevatedButton(text="Добавить", on_click=self.add_category)
+		self.busy_indicator = ft.ProgressRing(width=16, height=16, visible=False)
 		self.reload_button = ft.IconButton(
 			icon=ft.Icons.REFRESH,
 			tooltip="Reload",
@@ -29,12 +30,11 @@ class CategoryView(BaseView):
 		)
 
 		# Blank table for items
-		self.table = ft.DataTable(
-			columns=[
-				ft.DataColumn(ft.Text("")),
-				ft.DataColumn(ft.Text("")),
-			],
-			rows=[],
+		self.table = KeyedTable(
+			columns=["", ""],
+			key=lambda category: category["id"],
+			create_cells=self.create_row_cells,
+			fill_cells=self.fill_row_cells,
 			expand=True
 		)
 
@@ -44,7 +44,8 @@ class CategoryView(BaseView):
 					controls=[
 						self.new_category_field,
 						self.add_button,
-						self.reload_button
+						self.reload_button,
+						self.busy_indicator
 					],
 					alignment=ft.MainAxisAlignment.CENTER,
 					spacing=50,
@@ -73,16 +74,17 @@ class CategoryView(BaseView):
 		self.load_categories()
 
 	""" Add new category to db """
+	@background
 	def add_category(self, e=None):
 		category = self.new_category_field.value
 		if not "".join(category.split(" ")).isalnum():
 			print(f"Wrong 'category' field format")
 			utils.show_dialog(self, "Заполните данные!", "Поле с названием новой категории не может быть пустым")
 		else:
-			new_category = json.dumps({
+			new_category = {
 				"category": category,
-			})
-			response = requests.post(f'{self.page.ROOT_URL}/add-category', data=new_category, headers=self.page.content_provided_request_headers)
+			}
+			response = self.page.api.post('/add-category', json=new_category)
 			print(response)
 			if response.status_code in (200, 204):
 				utils.show_dialog(self, "Категория сохранена", "Данные таблицы обновлены")
@@ -92,44 +94,42 @@ class CategoryView(BaseView):
 				utils.show_dialog(self, "Ошибка!", "Такая категория уже существует. Выберите другое название")
 		
 	
-	""" Add item row to table """
-	def add_row(self, category):
-		self.table.rows.append(
-			ft.DataRow(
-				cells=[
-					ft.DataCell(ft.Text(category["category"], selectable=True)),
-					ft.DataCell(
-						ft.Container(
-							content=ft.ElevatedButton(
-								text="Удалить",
-								icon=ft.Icons.DELETE,
-								on_click=lambda e: self.delete_category(category=category)
-							),
-							alignment=ft.alignment.center_right,
-							expand=True, 
-						)
-					)
-				]
+	""" Create cell controls for one table row """
+	def create_row_cells(self):
+		return [
+			ft.Text(selectable=True),
+			ft.Container(
+				content=ft.ElevatedButton(
+					text="Удалить",
+					icon=ft.Icons.DELETE,
+					on_click=lambda e: self.delete_category(e, category=e.control.data)
+				),
+				alignment=ft.alignment.center_right,
+				expand=True, 
 			)
-		)
-		self.page.update()
+		]
+
+	""" Put category data into cells of table row """
+	def fill_row_cells(self, cells, category):
+		cells[0].value = category["category"]
+		cells[1].content.data = category
 
 	""" Load list of available categories from server """
+	@background
 	def load_categories(self, e=None):
-		resp = requests.get(f'{self.page.ROOT_URL}/categories', headers=self.page.request_headers)
+		resp = self.page.api.get('/categories')
 		if resp.status_code in [200, 204]:
-			self.table.rows.clear()
 			self.page.categories = resp.json()
-			for category in self.page.categories:
-				self.add_row(category)
+			self.table.set_records(self.page.categories)
 			print("Loaded categories")
 
+	@background
 	def delete_category(self, e=None, category=None):
-		if any([category["category"]==item["category"] for item in self.page.loaded_items]):
+		if any(item.category == category["category"] for item in self.page.loaded_items or []):
 			utils.show_dialog(self, "Категория используется!", "Нельзя удалить категорию, которая используется одним или более объектом")
 			return
 		id = category["id"]
-		response = requests.delete(f"{self.page.ROOT_URL}/delete-category/{id}",  headers=self.page.content_provided_request_headers)
+		response = self.page.api.delete(f"/delete-category/{id}")
 		print(response)
 		if response.status_code in (200, 204):
 			print(f"=> Deleted category id={id}")
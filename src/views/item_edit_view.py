@@ -1,16 +1,15 @@
 from .base_view import BaseView
 import flet as ft
 from lib import utils
-import json
-import requests
+from lib.tasks import background
 import datetime
-import base64
+import os
 
 class ItemEditView(BaseView):
     def __init__(self, page: ft.Page, id, img, category, date, sum):
         super().__init__(page=page, view_route='/edititem', on_exit_view_path='/items')
 
-        self.file_picker = ft.FilePicker(on_result=lambda e: utils.file_picked(self, e))
+        self.file_picker = ft.FilePicker(on_result=lambda e: utils.file_picked(self, e, encode=False))
         self.page.overlay.append(self.file_picker)
         self.file_path = None
         self.id = id
@@ -18,9 +17,7 @@ class ItemEditView(BaseView):
         self.original_category = category
         self.original_sum = sum
         self.original_date = utils.date_to_text(date)
-        self.original_img_path = img
-        self.original_img_base64 = utils.encode_base64(img)
-        self.frame_base64 = self.original_img_base64
+        self.original_img_path = self.page.photo_cache.get(id) or img
         self.has_changes = False
 
         self.appbar = ft.AppBar(
@@ -106,9 +103,10 @@ class ItemEditView(BaseView):
         return self.category_dropdown.value != self.original_category or \
             self.sum_field.value != self.original_sum or \
             self.date_field.value != self.original_date or \
-            self.frame_base64 != self.original_img_base64
+            self.file_path is not None
         
 
+    @background
     def submit(self, e):
         try:
             sum_float = float(self.sum_field.value)
@@ -121,15 +119,28 @@ class ItemEditView(BaseView):
             utils.show_dialog(self, "Не сохранено", "Сумма введена некорректно. Введите числовое значение")
             return
 
-        modified_item = json.dumps({
+        modified_item = {
             "id": self.id,
             "category": self.category_dropdown.value,
             "sum": sum_float,
-            "creation_date": date_sql,
-            "image": self.frame_base64
-        })
-        
-        response = requests.post(f'{self.page.ROOT_URL}/update-item', data=modified_item, headers=self.page.content_provided_request_headers)
-        print(response)
+            "creation_date": date_sql
+        }
+
+        # server expects photo in every update: picked photo of upload size or current one is streamed from disk
+        upload_path = self.original_img_path
+        if self.file_path is not None:
+            upload_path = self.page.image_policy.apply(self.file_path, self.page.TEMP_STORAGE_PATH)
+        elif not upload_path or not os.path.isfile(upload_path):
+            print(f"> Upload : photo of item id={self.id} is not loaded, sending item fields only")
+            upload_path = None
+        try:
+            response = self.page.uploader.send('/update-item', modified_item, upload_path)
+            print(response)
+            if response.status_code in (200, 204) and self.file_path is not None:
+                # keep cached photo in sync with server
+                self.page.photo_cache.put_copy(self.id, upload_path)
+        finally:
+            if upload_path not in (None, self.file_path, self.original_img_path):
+                os.remove(upload_path)
         utils.show_dialog(self, "Сохранено", "Чтобы увидеть изменения, перезагрузите страницу")
         self.page.update()
@@ -1,43 +1,107 @@
 from .base_view import BaseView
 import flet as ft
-import requests
-from lib import utils, controls
+from lib import utils, controls, models
+from lib.table import VirtualTable, KeyedTable
+from lib.aggregates import Aggregates
+from lib.tasks import background
+from lib.timer import Debouncer
+from lib.sorting import ItemSorter, toggle_sort
+from lib.download import download
+from lib.report_query import report_request, legacy_report_request
 import urllib.parse
 import datetime
+import hashlib
+import math
 import os
-import json
+
+
+# height of table rows, needed to find rows visible on screen
+ROW_HEIGHT = 48
+TABLE_HEIGHT = 400
+# seconds without typing after which filter is applied
+FILTER_DELAY = 0.3
+# table column index -> sort column
+SORT_COLUMNS = {0: 'date', 1: 'category', 2: 'sum'}
 
 
 class ItemsView(BaseView):
 	def __init__(self, page: ft.Page):
 		super().__init__(page=page, view_route="/items")
+		self.current_items = []
+		self.filter_debouncer = Debouncer(FILTER_DELAY, self.apply_filter)
+		self.sorter = ItemSorter()
+		# list of (sort column, ascending), first one is primary key
+		self.sort_spec = []
+		# parameters of applied filter, see ItemIndex.spec
+		self.filter_params = None
 
 		# Info panel with items count
 		self.item_count = ft.Text(value=f"Всего позиций: 0")
+		self.photo_progress = ft.Text(value="")
+		self.report_progress = ft.Text(value="")
+		self._shown_megabytes = None
+		self.busy_indicator = ft.ProgressRing(width=16, height=16, visible=False)
 
-		# Blank table for items
-		self.table = ft.DataTable(
+		# Blank table for items, only visible rows are rendered
+		self.table = VirtualTable(
 			columns=[
-				ft.DataColumn(ft.Text("Дата")),
-				ft.DataColumn(ft.Text("Категория")),
-				ft.DataColumn(ft.Text("Сумма")),
-				ft.DataColumn(ft.Text("Фото")),
-				ft.DataColumn(ft.Text("")),
-				ft.DataColumn(ft.Text("")),
+				("Дата", 110),
+				("Категория", 200),
+				("Сумма", 120),
+				("Фото", 160),
+				("", 150),
+				("", 190),
 			],
-			rows=[],
+			key=lambda item: item.id,
+			create_cells=self.create_row_cells,
+			fill_cells=self.fill_row_cells,
+			row_height=ROW_HEIGHT,
+			height=TABLE_HEIGHT,
+			on_window=self.prefetch_photos,
+			sortable=SORT_COLUMNS.keys(),
+			on_sort=self.sort_by,
 			expand=True
 		)
+
+		# Totals per category and month for current filter, hidden by default
+		self.summary_total = ft.Text(weight=ft.FontWeight.BOLD)
+		self.category_totals = KeyedTable(
+			columns=["Категория", "Кол-во", "Сумма"],
+			key=lambda row: row[0],
+			create_cells=self.create_total_cells,
+			fill_cells=lambda cells, row: self.fill_total_cells(cells, row, row[0])
+		)
+		self.month_totals = KeyedTable(
+			columns=["Месяц", "Кол-во", "Сумма"],
+			key=lambda row: row[0],
+			create_cells=self.create_total_cells,
+			fill_cells=lambda cells, row: self.fill_total_cells(cells, row, f"{row[0][1]:02d}.{row[0][0]}")
+		)
+		self.summary_panel = ft.Column(
+			controls=[
+				self.summary_total,
+				ft.Row(
+					[
+						ft.Column([self.category_totals], scroll=ft.ScrollMode.AUTO, height=300),
+						ft.Column([self.month_totals], scroll=ft.ScrollMode.AUTO, height=300)
+					],
+					vertical_alignment=ft.CrossAxisAlignment.START
+				)
+			],
+			visible=False
+		)
 		
 		self.controls.append(ft.AppBar(title=ft.Text("База данных"), bgcolor=ft.Colors.SURFACE_CONTAINER_HIGHEST))
-		self.start_filter_field = ft.TextField(label="Начальная дата")
-		self.end_filter_field = ft.TextField(label="Конечная дата")
-		self.minimum_sum_field = ft.TextField(label="Минимальная сумма")
-		self.maximum_sum_field = ft.TextField(label="Максимальная сумма")
+		# filter is applied as user types
+		self.start_filter_field = ft.TextField(label="Начальная дата", on_change=self.schedule_filter)
+		self.end_filter_field = ft.TextField(label="Конечная дата", on_change=self.schedule_filter)
+		self.minimum_sum_field = ft.TextField(label="Минимальная сумма", on_change=self.schedule_filter)
+		self.maximum_sum_field = ft.TextField(label="Максимальная сумма", on_change=self.schedule_filter)
 		self.category_dropdown = ft.Dropdown(
 				label="Категория",
 				options=[ft.dropdown.Option("", "Все")] + [ft.dropdown.Option(c["category"]) for c in self.load_categories(return_categories=True)],
-				value="Все"
+				value="Все",
+				on_change=self.schedule_filter
 		)
 		self.reload_button = ft.IconButton(
 			icon=ft.Icons.REFRESH,
@@ -69,6 +133,11 @@ class ItemsView(BaseView):
 						"Добавить объект", 
 						on_click=lambda e: self.page.go('/newitem')
 					),
+					ft.ElevatedButton(
+						"Итоги",
+						icon=ft.Icons.SUMMARIZE,
+						on_click=self.toggle_summary
+					),
 					self.reload_button
 				]),
 				ft.Row([
@@ -93,9 +162,10 @@ class ItemsView(BaseView):
 		)
 		
 
-		self.controls.append(self.item_count)
+		self.controls.append(ft.Row([self.item_count, self.photo_progress, self.report_progress, self.busy_indicator], spacing=30))
 		
-		self.controls.append(ft.ListView(controls=[self.table], expand=True, height=400))
+		self.controls.append(self.summary_panel)
+		self.controls.append(self.table)
 		self.page.dialog = ft.AlertDialog(
 			title=ft.Container(ft.Text(""), alignment=ft.alignment.center),
 			content=ft.Text(""),
@@ -105,58 +175,77 @@ class ItemsView(BaseView):
 			actions_alignment=ft.MainAxisAlignment.CENTER,
 		)
 
-		self.load_items()
+		# items are loaded in background so view is shown right away
+		self.page.run_thread(self.load_items)
 
-	""" Add item row to table """
-	def add_row(self, item):
-		date_ = utils.date_to_text(item['creation_date'])
+	""" Create cell controls for one table row, they are reused for different items on scroll """
+	def create_row_cells(self):
+		return [
+			ft.Text(selectable=True),
+			ft.Text(selectable=True),
+			ft.Text(selectable=True),
+			controls.ClickablePreview(
+				text='Посмотреть фото',
+				on_tap=self.on_photo_click,
+				height=ROW_HEIGHT - 8
+			),
+			ft.ElevatedButton(
+				text="Удалить",
+				icon=ft.Icons.DELETE, 
+				on_click=lambda e: self.delete_item(e, id=e.control.data.id)
+			),
+			ft.ElevatedButton(
+				text="Редактировать",
+				icon=ft.Icons.EDIT, 
+				on_click=lambda e: self.edit_item(item=e.control.data)
+			)
+		]
 
-		def on_photo_click(e):
-			img_path = os.path.join(self.page.STORAGE_PATH, 'temp', item['file_name'])
-			utils.open_image(img_path)
+	""" Put item data into cells of table row """
+	def fill_row_cells(self, cells, item):
+		cells[0].value = item.date_text
+		cells[1].value = item.category
+		cells[2].value = item.sum_text
+		# thumbnail is shown right away only if it is in memory, otherwise it is requested for visible rows
+		controls.set_preview(cells[3], self.page.thumbnails.peek(item))
+		for cell in cells[3:]:
+			cell.data = item
 
-		self.table.rows.append(
-			ft.DataRow(
-				cells=[
-					ft.DataCell(ft.Text(date_, selectable=True)),
-					ft.DataCell(ft.Text(item['category'], selectable=True)),
-					ft.DataCell(ft.Text(item['sum'], selectable=True)),
-					controls.ClickableDatacell( 
-						text='Посмотреть фото', 
-						on_tap=on_photo_click
-					),
-					ft.DataCell(ft.ElevatedButton(
-						text="Удалить",
-						icon=ft.Icons.DELETE, 
-						on_click=lambda e: self.delete_item(id=item['id'])
-					)),
-						ft.DataCell(ft.ElevatedButton(
-						text="Редактировать",
-						icon=ft.Icons.EDIT, 
-						on_click=lambda e: self.edit_item(item=item)
-					))
-				],
-			)
-		)
-		self.page.update()
+	def create_total_cells(self):
+		return [ft.Text(), ft.Text(), ft.Text()]
+
+	""" Put (key, count, cents) row of totals into cells """
+	def fill_total_cells(self, cells, row, title):
+		cells[0].value = title
+		cells[1].value = str(row[1])
+		cells[2].value = models.cents_to_text(row[2])
+
+	def on_photo_click(self, e):
+		img_path = self.page.photos.get(e.control.data)
+		if img_path is not None:
+			utils.open_image(img_path)
 
 
+	@background
 	def delete_item(self, e=None, id=None):
-		response = requests.delete(f"{self.page.ROOT_URL}/delete-item/{int(id)}",  headers=self.page.content_provided_request_headers)
+		response = self.page.api.delete(f"/delete-item/{int(id)}")
 		print('-', response)
 		if response.status_code in (200, 204):
 			print(f"Deleted item id={id}")
-			self.page.filtered_items = None
-			self.page.loaded_items = None
-			self.page.go("/items")
+			self.page.photo_cache.discard(id)
+			self.page.sync.remove(id)
+			self.page.loaded_items = self.page.sync.items
+			if self.page.filtered_items is not None:
+				self.page.filtered_items = [item for item in self.page.filtered_items if item.id != id]
+			self.load_items(reset_scroll=False)
 
 
 	def edit_item(self, e=None, item=None):
-		img_path = urllib.parse.quote(os.path.join(self.page.STORAGE_PATH, 'temp', item['file_name']))
-		category = urllib.parse.quote(item['category'])
-		id_ = urllib.parse.quote(str(item['id']))
-		date = urllib.parse.quote(str(item['creation_date']))
-		sum_ = urllib.parse.quote(str(item['sum']))
+		img_path = urllib.parse.quote(self.page.photos.get(item) or '')
+		category = urllib.parse.quote(item.category)
+		id_ = urllib.parse.quote(str(item.id))
+		date = urllib.parse.quote(item.creation_date)
+		sum_ = urllib.parse.quote(item.sum_text)
 		route = f"/edititem?id={id_}&img={img_path}&category={category}&date={date}&sum={sum_}"
 		self.page.go(route)
 
@@ -166,106 +255,264 @@ class ItemsView(BaseView):
 	return_categories (boolean) - return list of categories as result
 	"""
 	def load_categories(self, return_categories=False):
-		resp = requests.get(f'{self.page.ROOT_URL}/categories', headers=self.page.request_headers)
+		resp = self.page.api.get('/categories')
 		if resp.status_code in [200, 204]:
 			self.page.categories = resp.json()
 			if return_categories: 
 				return resp.json()
 
-	""" Load file image from server and save it to local storage """
-	def load_photo(self, item):
-		resp = requests.get(f"{self.page.ROOT_URL}/files/{item['id']}", headers=self.page.request_headers)
-		with open(os.path.join(self.page.STORAGE_PATH, 'temp', item['file_name']), 'wb') as f:
-			f.write(resp.content)
+	""" 
+	Load photos of visible rows and next page in background.
+	first - index of first visible row
+	visible_count - number of visible rows
+	"""
+	def prefetch_photos(self, first, visible_count):
+		items = self.current_items[first:first + 2*visible_count]
+		pending = self.page.photos.prefetch(items, on_progress=self.update_photo_progress)
+		self.update_photo_progress(self.page.photos.loaded_count, pending)
+		self.page.thumbnails.request(self.current_items[first:first + visible_count], self.show_thumbnail)
+
+	""" Put thumbnail made in background into row of item if the row is still rendered """
+	def show_thumbnail(self, item, thumbnail):
+		def update(cells, record):
+			# row may be shown for other version of item after thumbnail was requested
+			if cells[3].data is not item:
+				return None
+			controls.set_preview(cells[3], thumbnail)
+			return cells[3]
+
+		self.table.update_row(item.id, update)
 
 	""" Load items from buffer and add them to table """
-	def load_items(self):
-		self.table.rows.clear()
+	def load_items(self, reset_scroll=True):
 		if self.page.loaded_items is None:
 			self.load_all_items()
+
+		if self.page.filtered_items is None: 
 			current_items = self.page.loaded_items
 		else:
-			if self.page.filtered_items is None: 
-				current_items = self.page.loaded_items
-			else:
-				current_items = self.page.filtered_items
-			
-			for item in current_items:
-				self.add_row(item)
-
-		self.page.update()
+			current_items = self.page.filtered_items
+
+		if self.sorter.items is not self.page.loaded_items:
+			self.sorter.reset(self.page.loaded_items or [])
+		self.current_items = self.sorter.sort(current_items or [], self.sort_spec)
+		self.table.set_records(self.current_items, reset_scroll=reset_scroll)
 		self.update_count(current_items)
+		self.update_summary()
+
+	""" Show part of item list while it is being loaded """
+	def show_loaded_batch(self, items):
+		if self.page.filtered_items is not None:
+			return
+		first_batch = not self.current_items
+		self.current_items = items
+		self.table.set_records(items, reset_scroll=first_batch)
+		self.update_count(items)
 
-	""" Get list of all items from server """
+	""" Sync list of all items with server, rows are shown as they arrive """
 	def load_all_items(self):
-		resp = requests.get(f'{self.page.ROOT_URL}/item/all', headers=self.page.request_headers)
-		if resp.status_code in [200, 204]:
-			loaded_items = []
-			for item in resp.json():
-				loaded_items.append(item)
-				self.load_photo(item)
-			self.page.loaded_items = loaded_items
-			for item in self.page.loaded_items:
-				self.add_row(item)
+		items = self.page.sync.refresh(on_batch=self.show_loaded_batch)
+		if items is not None:
+			self.page.loaded_items = items
+			# list can be changed in place by sync, sort keys are computed again
+			self.sorter.reset(items)
+			self.page.photo_cache.prune([item.id for item in items])
+			self.page.thumbnails.prune()
+			self.page.photos.expire(self.page.sync.changed_ids)
 		print("> Loaded all available items")
 
+	""" 
+	Sort table by clicked column, previous sort columns are used for equal values
+	column - table column index
+	"""
+	def sort_by(self, column):
+		self.sort_spec = toggle_sort(self.sort_spec, SORT_COLUMNS[column])
+		indexes = {name: i for i, name in SORT_COLUMNS.items()}
+		self.table.set_sort_marks([(indexes[name], ascending) for name, ascending in self.sort_spec])
+		self.load_items()
+
 	""" Reset filter fields and updates items table """
+	@background
 	def reset_filter(self, e=None):
+		self.filter_debouncer.cancel()
 		self.start_filter_field.value = None
 		self.end_filter_field.value = None
 		self.minimum_sum_field.value = None
 		self.maximum_sum_field.value = None
 		self.category_dropdown.value = "Все"
+		for field in (self.start_filter_field, self.end_filter_field, self.minimum_sum_field, self.maximum_sum_field, self.category_dropdown):
+			try:
+				field.update()
+			except Exception as e:
+				pass
 		self.page.filtered_items = None
-		self.page.loaded_items = None
+		self.filter_params = None
+		self.load_all_items()
 		self.load_items()
 		print("> Filter reset")
 
-	""" Get item filtered by date """	
-	def apply_filter(self, e):
-		start = utils.date_to_sql(self.start_filter_field.value)
-		end = utils.date_to_sql(self.end_filter_field.value)
+	""" Apply filter after user stops typing """
+	def schedule_filter(self, e=None):
+		self.filter_debouncer.call()
+
+	""" Read sum from filter field, unfinished or invalid value (also nan / inf) is ignored """
+	def read_sum(self, field, default):
+		try:
+			value = float((field.value or '').replace(',', '.'))
+		except ValueError:
+			return default
+		return value if math.isfinite(value) else default
+
+	""" 
+	Get items filtered by date, sum and category.
+	Fields that are empty or not filled in completely are ignored
+	"""
+	def apply_filter(self, e=None):
+		self.filter_debouncer.cancel()
+		start = utils.date_to_sql(self.start_filter_field.value or '')
+		end = utils.date_to_sql(self.end_filter_field.value or '')
 
-		minimum_sum = self.minimum_sum_field.value
-		maximum_sum = self.maximum_sum_field.value
-		minimum_sum = int(minimum_sum) if minimum_sum != '' else 0
-		maximum_sum = int(maximum_sum) if maximum_sum != '' else float('inf')
+		minimum_sum = self.read_sum(self.minimum_sum_field, 0)
+		maximum_sum = self.read_sum(self.maximum_sum_field, float('inf'))
 
 		category = self.category_dropdown.value
-		if category == "Все": 
+		if category in ["", "Все"]: 
 			category = None
 
-		if category in [None, "Все"] and start == end == None and minimum_sum == 0 and maximum_sum == float('inf'):
-			print("> Filter not applied : parameters not set")
+		if category is None and start == end == None and minimum_sum == 0 and maximum_sum == float('inf'):
+			if self.page.filtered_items is not None:
+				self.page.filtered_items = None
+				self.filter_params = None
+				self.load_items()
+				print("> Filter removed : parameters not set")
 			return
 
-		filtered = utils.get_filtered_items(self.page.loaded_items, start, end, minimum_sum, maximum_sum, category)
+		if self.page.loaded_items is None:
+			print("> Filter not applied : items are not loaded")
+			return
+		self.filter_params = (start, end, minimum_sum, maximum_sum, category)
+		filtered = self.page.sync.index.filter(*self.filter_params)
 		self.page.filtered_items = filtered
 		self.load_items()
 
 
 	""" 
-	Get report from server.
+	Get report from server or build it locally (LOCAL_REPORT in config).
 	Uses filtered items, 
 	otherwise returns report about all items 
 	"""
+	@background
 	def get_report(self, e):
 		if self.page.filtered_items is None:
 			items = self.page.loaded_items
 		else:
 			items = self.page.filtered_items
-		id_list = json.dumps({
-			"id_list": [int(item['id']) for item in items]
-		})
-		resp = requests.get(f'{self.page.ROOT_URL}/report', data=id_list, headers=self.page.content_provided_request_headers)
+		if self.page.LOCAL_REPORT:
+			self.build_local_report(items)
+			return
+		filename = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + '.pdf'
+		path = os.path.join(self.page.STORAGE_PATH, filename)
+		# report is written to file as it arrives, file name depends only on reported items,
+		# so interrupted download of the same report is resumed by next attempt
+		download_path = self.report_download_path(items)
+		self._shown_megabytes = None
+		resp = None
+		if self.page.COMPACT_REPORT_REQUEST:
+			filter_params = () if self.page.filtered_items is None else self.filter_params
+			resp = download(self.page.api, '/report', download_path, on_progress=self.update_download_progress, **report_request(filter_params, items))
+			if resp.status_code in [400, 415, 422]:
+				print("> Report : compact request is not supported by server, sending id list")
+				self.page.COMPACT_REPORT_REQUEST = False
+				resp = None
+			elif resp.status_code >= 500:
+				# server may fail on compact body, id list is tried for this report
+				print(f"> Report : compact request failed with {resp.status_code}, sending id list")
+				resp = None
+		if resp is None:
+			resp = download(self.page.api, '/report', download_path, on_progress=self.update_download_progress, **legacy_report_request(items))
 		print(resp)
-		if resp.status_code in [200, 204]:
-			filename = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + '.pdf'
-			path = os.path.join(self.page.STORAGE_PATH, filename)
-			with open(path, 'wb') as f:
-				f.write(resp.content)
-				utils.show_dialog(self, text="Отчет сформирован", desc=f"Путь к файлу: {path}")
-				print("> Report loaded")
+		self.update_report_progress(0, 0)
+		if resp.status_code in [200, 206]:
+			os.replace(download_path, path)
+			utils.show_dialog(self, text="Отчет сформирован", desc=f"Путь к файлу: {path}")
+			print("> Report loaded")
+
+	"""
+	Get temp path for downloading report about items.
+	Partial files left in temp storage are removed on app close
+	"""
+	def report_download_path(self, items):
+		ids = ','.join(str(id_) for id_ in sorted(item.id for item in items))
+		digest = hashlib.sha256(ids.encode('utf-8')).hexdigest()[:16]
+		return os.path.join(self.page.TEMP_STORAGE_PATH, f"report_{digest}.pdf")
+
+	def toggle_summary(self, e=None):
+		self.summary_panel.visible = not self.summary_panel.visible
+		self.update_summary()
+		try:
+			self.summary_panel.update()
+		except Exception as e:
+			pass
+
+	""" 
+	Show totals of current item list.
+	Totals are kept by item index and updated on changes, 
+	here they are only read, so it is cheap to call after every change
+	"""
+	def update_summary(self):
+		if not self.summary_panel.visible or self.page.loaded_items is None:
+			return
+		index = self.page.sync.index
+		if self.page.filtered_items is None:
+			summary = index.totals()
+		elif self.filter_params is not None:
+			summary = index.summary(*self.filter_params)
+		else:
+			# filter was applied in other view instance, parameters are unknown
+			summary = Aggregates()
+			summary.reset(self.page.filtered_items)
+		categories, months = summary.rows()
+		self.summary_total.value = f"Итого: {summary.count} шт., {models.cents_to_text(summary.cents)}"
+		try:
+			self.summary_total.update()
+		except Exception as e:
+			pass
+		self.category_totals.set_records(categories)
+		self.month_totals.set_records(months)
+
+	""" Build pdf report from loaded items and cached photos """
+	def build_local_report(self, items):
+		filename = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + '.pdf'
+		path = os.path.join(self.page.STORAGE_PATH, filename)
+		self.page.report.build(items, path, on_progress=self.update_report_progress)
+		utils.show_dialog(self, text="Отчет сформирован", desc=f"Путь к файлу: {path}")
+		print("> Report built")
+
+	def update_report_progress(self, done, total):
+		try:
+			self.report_progress.value = f"Отчет: {done} из {total}" if done < total else ""
+			self.report_progress.update()
+		except Exception as e:
+			pass
+
+	""" Show downloaded size of report, text is updated once per megabyte """
+	def update_download_progress(self, done, total):
+		megabytes = done // (1024*1024)
+		if megabytes == self._shown_megabytes:
+			return
+		self._shown_megabytes = megabytes
+		try:
+			self.report_progress.value = f"Отчет: {megabytes} МБ" + (f" из {total // (1024*1024)} МБ" if total else "")
+			self.report_progress.update()
+		except Exception as e:
+			pass
+
+	def update_photo_progress(self, loaded, pending):
+		try:
+			self.photo_progress.value = f"Загружено фото: {loaded}, в очереди: {pending}"
+			self.photo_progress.update()
+		except Exception as e:
+			pass
 
 	def update_count(self, items):
 		try:
@@ -1,6 +1,6 @@
 from .base_view import BaseView
 import flet as ft
-import requests
+from lib.tasks import background
 
 class LoginView(BaseView):
 	def __init__(self, page: ft.Page):
@@ -34,6 +34,7 @@ class LoginView(BaseView):
 	
 
 	""" Login button handler """
+	@background
 	def login_click(self, e):
 		credentials = {
 			'username': self.username.value.strip(),
@@ -41,18 +42,14 @@ class LoginView(BaseView):
 		}
 		self.result_text.value = "Выполняется вход..."
 		self.result_text.update()
-		resp = requests.get(f'{self.page.ROOT_URL}/login', json=credentials)
+		resp = self.page.api.get('/login', json=credentials)
 
 		if resp.status_code in (200, 204):
 			token = resp.json()['access_token']
 			user_data = resp.json()['user_data']
 			self.page.current_session_username = user_data['username']
 			self.page.current_session_admin = user_data['admin']
-			self.page.request_headers = {'Authorization': f'Bearer {token}'}
-			self.page.content_provided_request_headers = {
-				'Content-Type': 'application/json',
-				'Authorization': f'Bearer {token}'
-			}
+			self.page.api.set_token(token)
 			self.result_text.value = "Успешный вход!"
 			print("> Login : success")
 			self.page.go("/items")
@@ -1,13 +1,11 @@
 from .base_view import BaseView
 import flet as ft
-import requests
-import json
 import os
 import datetime
-import base64
 from lib import utils
 from lib.stream import Stream
 from lib.timer import Timer
+from lib.tasks import background
 
 
 class NewItemView(ft.View):
@@ -16,7 +14,7 @@ class NewItemView(ft.View):
 		self.page = page
 		self.stream = Stream()
 
-		self.file_picker = ft.FilePicker(on_result=lambda e: utils.file_picked(self, e))
+		self.file_picker = ft.FilePicker(on_result=lambda e: utils.file_picked(self, e, encode=False))
 		self.page.overlay.append(self.file_picker)
 		self.file_path = None
 
@@ -163,8 +161,7 @@ class NewItemView(ft.View):
 			category = self.category_dropdown.value
 			sum_ = self.sum_field.value
 			date_ = self.date_field.value
-			img_base64 = self.frame_base64
-			if all([category, sum_, date_, img_base64]):
+			if all([category, sum_, date_, self.file_path]):
 				self.submit_button.disabled = False
 			else:
 				self.submit_button.disabled = True
@@ -179,7 +176,9 @@ class NewItemView(ft.View):
 	""" Release camera """
 	def close_camera_connection(self):
 		self.camera_on = False
+		stats = self.stream.stats()
 		self.stream.release()
+		print(f"> Camera : captured {stats['captured']} frames, dropped {stats['dropped']}")
 		self.photo_placeholder.content = None
 		self.photo_placeholder.width = 400
 		self.photo_placeholder.height = 400
@@ -217,19 +216,21 @@ class NewItemView(ft.View):
 		if not self.camera_on: 
 			return
 
-		frame_base64 = self.stream.get_frame()
-		if frame_base64:
-			# Creating base64 image and put it into placeholder
-			frame_shape = utils.clamp_shape(self.stream.frame_shape)
-			self.photo_placeholder.width = frame_shape[1]
-			self.photo_placeholder.height = frame_shape[0]
-			self.photo_placeholder.content = ft.Image(
-				src_base64=frame_base64,
-				width=self.photo_placeholder.width,
-				height=self.photo_placeholder.height,
-				fit=ft.ImageFit.CONTAIN,
-			)
-
+		# frame already shown is not encoded and sent to UI again,
+		# preview is enhanced after downscale, full frame is enhanced only in take_photo
+		frame_base64 = self.stream.get_preview(only_new=True)
+		if not frame_base64:
+			return
+		# Creating base64 image and put it into placeholder
+		frame_shape = utils.clamp_shape(self.stream.frame_shape)
+		self.photo_placeholder.width = frame_shape[1]
+		self.photo_placeholder.height = frame_shape[0]
+		self.photo_placeholder.content = ft.Image(
+			src_base64=frame_base64,
+			width=self.photo_placeholder.width,
+			height=self.photo_placeholder.height,
+			fit=ft.ImageFit.CONTAIN,
+		)
 		self.photo_placeholder.update()
 
 	""" Make photo and save it to local storage """
@@ -247,12 +248,25 @@ class NewItemView(ft.View):
 			utils.show_dialog(self, "Ошибка", "Некорректный источник")
 		self.page.update()
 
+	"""
+	Put sent photo into photo cache and make its thumbnail.
+	Photo is cached only if server replies with created item
+	"""
+	def cache_photo(self, response, upload_path):
+		try:
+			id_ = response.json().get("id")
+		except Exception as e:
+			return
+		if id_ is not None:
+			self.page.photo_cache.put_copy(id_, upload_path)
+			self.page.thumbnails.prepare(id_)
+
 	""" Submit data from item creation form """
+	@background
 	def submit(self, e):
 		category = self.category_dropdown.value
 		sum_ = self.sum_field.value
 		date_ = self.date_field.value
-		img_base64 = self.frame_base64
 		try:
 			sum_float = float(sum_)
 			date_ = utils.date_to_sql(date_)
@@ -266,13 +280,20 @@ class NewItemView(ft.View):
 			utils.show_dialog(self, "Ошибка", "Сумма введена некорректно. В поле суммы необходимо вносить только числовые значения")
 			return
 
-		new_item = json.dumps({
+		new_item = {
 			"category": category,
 			"sum": sum_float,
-			"creation_date": date_,
-			"image": img_base64
-		})
-		response = requests.post(f'{self.page.ROOT_URL}/add-item', data=new_item, headers=self.page.content_provided_request_headers)
+			"creation_date": date_
+		}
+		# photo of upload size is streamed from disk
+		upload_path = self.page.image_policy.apply(self.file_path, self.page.TEMP_STORAGE_PATH)
+		try:
+			response = self.page.uploader.send('/add-item', new_item, upload_path)
+			if response.status_code in [200, 201]:
+				self.cache_photo(response, upload_path)
+		finally:
+			if upload_path != self.file_path:
+				os.remove(upload_path)
 		print(response)
 		utils.show_dialog(self, "Объект сохранен", "Чтобы увидеть изменения, перезагрузите страницу")
 		self.page.update()
\ No newline at end of file
@@ -1,8 +1,8 @@
 from .base_view import BaseView
 import flet as ft
 from lib import utils, controls
-import requests
-import json
+from lib.table import KeyedTable
+from lib.tasks import background
 
 
 class UserView(BaseView):
@@ -17,6 +17,7 @@ class UserView(BaseView):
 				width=200
 		)
 		self.add_button = ft.ElevatedButton(text="Добавить", on_click=self.add_user)
+		self.busy_indicator = ft.ProgressRing(width=16, height=16, visible=False)
 		self.reload_button = ft.IconButton(
 			icon=ft.Icons.REFRESH,
 			tooltip="Reload",
@@ -35,13 +36,11 @@ class UserView(BaseView):
 		)
 
 		# Blank table for items
-		self.table = ft.DataTable(
-			columns=[
-				ft.DataColumn(ft.Text("Имя пользователя")),
-				ft.DataColumn(ft.Text("Права администратора")),
-				ft.DataColumn(ft.Text(""))
-			],
-			rows=[],
+		self.table = KeyedTable(
+			columns=["Имя пользователя", "Права администратора", ""],
+			key=lambda user: user["username"],
+			create_cells=self.create_row_cells,
+			fill_cells=self.fill_row_cells,
 			expand=True
 		)
 
@@ -53,7 +52,8 @@ class UserView(BaseView):
 						self.password_field,
 						self.admin_rights_dropdown,
 						self.add_button,
-						self.reload_button
+						self.reload_button,
+						self.busy_indicator
 					],
 					alignment=ft.MainAxisAlignment.CENTER,
 					spacing=50,
@@ -82,6 +82,7 @@ class UserView(BaseView):
 		self.load_users()
 
 	""" Add new user to db """
+	@background
 	def add_user(self, e=None):
 		username = self.username_field.value
 		password = self.password_field.value
@@ -90,12 +91,12 @@ class UserView(BaseView):
 			print(f"Wrong input data format")
 			utils.show_dialog(self, "Заполните данные!", "Проверьте, что в каждом поле указано значение")
 		else:
-			new_user = json.dumps({
+			new_user = {
 				"username": username,
 				"password": password,
 				"admin": int(admin)
-			})
-			response = requests.post(f'{self.page.ROOT_URL}/add-user', data=new_user, headers=self.page.content_provided_request_headers)
+			}
+			response = self.page.api.post('/add-user', json=new_user)
 			print(response)
 			if response.status_code in (200, 204):
 				utils.show_dialog(self, "Пользователь сохранен", "Данные таблицы обновлены")
@@ -105,48 +106,45 @@ class UserView(BaseView):
 				utils.show_dialog(self, "Ошибка!", "Пользователь с таким именем уже существует")
 		
 	
-	""" Add item row to table """
-	def add_row(self, user):
-		username = user["username"]
+	""" Create cell controls for one table row """
+	def create_row_cells(self):
+		return [
+			ft.Text(selectable=True),
+			ft.Text(selectable=False),
+			ft.Container(
+				content=ft.ElevatedButton(
+					text="Удалить",
+					icon=ft.Icons.DELETE,
+					on_click=lambda e: self.delete_user(e, username=e.control.data)
+				),
+				alignment=ft.alignment.center_right,
+				expand=True, 
+			)
+		]
+
+	""" Put user data into cells of table row """
+	def fill_row_cells(self, cells, user):
+		cells[0].value = user["username"]
 		if user["admin"] == 0:
-			admin = 'Нет'
+			cells[1].value = 'Нет'
 		else:
-			admin = 'Да'
-		self.table.rows.append(
-			ft.DataRow(
-				cells=[
-					ft.DataCell(ft.Text(username, selectable=True)),
-					ft.DataCell(ft.Text(admin, selectable=False)),
-					ft.DataCell(
-						ft.Container(
-							content=ft.ElevatedButton(
-								text="Удалить",
-								icon=ft.Icons.DELETE,
-								on_click=lambda e: self.delete_user(username=username)
-							),
-							alignment=ft.alignment.center_right,
-							expand=True, 
-						)
-					)
-				]
-			)
-		)
-		self.page.update()
+			cells[1].value = 'Да'
+		cells[2].content.data = user["username"]
 
 	""" Load list of active users from server """
+	@background
 	def load_users(self, e=None):
-		resp = requests.get(f'{self.page.ROOT_URL}/users', headers=self.page.request_headers)
+		resp = self.page.api.get('/users')
 		if resp.status_code in [200, 204]:
-			self.table.rows.clear()
-			for user in resp.json():
-				self.add_row(user)
+			self.table.set_records(resp.json())
 			print("Loaded users")
 
+	@background
 	def delete_user(self, e=None, username=None):
 		if username == self.page.current_session_username:
 			utils.show_dialog(self, "Ошибка!", "Нельзя удалить данные пользователя, который используется вами в данный момент")
 			return
-		response = requests.delete(f"{self.page.ROOT_URL}/delete-user/{username}",  headers=self.page.content_provided_request_headers)
+		response = self.page.api.delete(f"/delete-user/{username}")
 		print(response)
 		if response.status_code in (200, 204):
 			print(f"=> Deleted user = {username}")